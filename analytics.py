@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多会话飞行数据统计
+
+流式遍历游戏目录 (可包含多名驾驶员的子目录) 中的飞行日志、CPSNA 感谢信与遥测录制，
+汇总进入曲率驱动的耗时、故障频率、每光年能耗与成就获得率等指标。
+
+    python3 analytics.py                      # 统计 ~/.fusion_game
+    python3 analytics.py /srv/pilots --jobs 4 # 多进程并行处理各文件
+    python3 analytics.py --json report.json
+
+每个文件逐行/逐帧读取，只保留可合并的计数，内存占用与文件大小无关。各文件的
+中间结果连同修改时间保存在状态文件中，再次运行时只处理新增或修改过的文件。
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Tuple, Any
+
+from main import (TelemetryReplay, TELEMETRY_FIELDS, COMPONENT_FLAGS,
+                  ACHIEVEMENT_NAMES, LY_TO_KM)
+
+STATE_FILE = "analytics_state.json"
+STATE_VERSION = 1
+
+LOG_NAME = "flight_log.txt"
+LETTER_NAME = "CPSNA.txt"
+TELEMETRY_EXT = ".ftl"
+
+# 飞行日志中的关键事件
+SESSION_START = "系统启动"
+SESSION_END = "用户退出系统"
+WARP_START = "启动曲率场平衡器"
+ACHIEVEMENT_PREFIX = "获得成就: "
+MALFUNCTION_PREFIXES = {
+    "随机事件: 部件故障": "随机部件故障",
+    "错误尝试: 未启动能量栈堆即启动主聚变堆": "能量过载风险",
+    "发动机热锁死": "发动机热锁死",
+    "严重违规": "违法启动曲率驱动",
+}
+
+FIELD_INDEX = {name: index for index, (name, _) in enumerate(TELEMETRY_FIELDS)}
+WARP_BIT = 1 << COMPONENT_FLAGS.index("CURVATURE_DRIVE_ACTIVE")
+
+Stats = Dict[str, Any]
+
+
+def discover(root: str) -> Iterator[Tuple[str, str]]:
+    """递归列出需要统计的文件，产出 (路径, 类型)"""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name == LOG_NAME:
+                    yield entry.path, "log"
+                elif entry.name == LETTER_NAME:
+                    yield entry.path, "letter"
+                elif entry.name.endswith(TELEMETRY_EXT):
+                    yield entry.path, "telemetry"
+
+
+def log_entries(path: str) -> Iterator[Tuple[str, str]]:
+    """逐行产出 (时间戳文本, 事件)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith("[") and "] " in line:
+                stamp, message = line[1:].split("] ", 1)
+                yield stamp, message.rstrip("\n")
+
+
+def parse_stamp(stamp: str) -> float:
+    return datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').timestamp()
+
+
+def analyze_log(path: str) -> Stats:
+    """按会话统计飞行日志
+
+    登录成就在"系统启动"之前写入日志，因此上一会话退出后出现的成就计入下一会话。
+    """
+    stats = new_stats()
+    session_start = None
+    warped = False
+    earned = set()
+
+    def end_session():
+        for name in earned:
+            stats["achievements"][name] = stats["achievements"].get(name, 0) + 1
+
+    for stamp, message in log_entries(path):
+        if message.startswith(SESSION_START):
+            if session_start is not None:
+                # 上一会话异常中断，没有退出记录
+                end_session()
+                earned = set()
+            stats["sessions"] = stats.get("sessions", 0) + 1
+            session_start = parse_stamp(stamp)
+            warped = False
+        elif message.startswith(SESSION_END):
+            if session_start is not None:
+                end_session()
+            session_start = None
+            earned = set()
+        elif message.startswith(WARP_START) and not warped and session_start is not None:
+            warped = True
+            stats["warp_sessions"] = stats.get("warp_sessions", 0) + 1
+            add_sample(stats, "time_to_warp", parse_stamp(stamp) - session_start)
+        elif message.startswith(ACHIEVEMENT_PREFIX):
+            earned.add(message[len(ACHIEVEMENT_PREFIX):])
+        else:
+            for prefix, kind in MALFUNCTION_PREFIXES.items():
+                if message.startswith(prefix):
+                    stats["malfunctions"][kind] = stats["malfunctions"].get(kind, 0) + 1
+                    break
+    if session_start is not None:
+        end_session()
+    return stats
+
+
+def analyze_telemetry(path: str) -> Stats:
+    """统计一次录制的飞行: 进入曲率驱动耗时、航程与能耗"""
+    stats = new_stats()
+    try:
+        replay = TelemetryReplay(path)
+    except (OSError, ValueError):
+        stats["invalid_files"] = 1
+        return stats
+    try:
+        last = None
+        warp_time = None
+        for frame in replay.frames():
+            if warp_time is None and frame[FIELD_INDEX["COMPONENTS"]] & WARP_BIT:
+                warp_time = frame[FIELD_INDEX["TIMESTAMP"]] - replay.start_time
+            last = frame
+        if last is None:
+            return stats
+        stats["flights"] = 1
+        if warp_time is not None:
+            stats["warp_flights"] = 1
+            add_sample(stats, "telemetry_time_to_warp", warp_time)
+        light_years = last[FIELD_INDEX["DISTANCE_KM"]] / LY_TO_KM
+        if light_years > 0:
+            stats["light_years"] = light_years
+            stats["energy"] = last[FIELD_INDEX["TOTAL_ENERGY_CONSUMED"]]
+            add_sample(stats, "flight_light_years", light_years)
+        return stats
+    finally:
+        replay.close()
+
+
+def analyze_letter(path: str) -> Stats:
+    stats = new_stats()
+    stats["letters"] = 1
+    return stats
+
+
+ANALYZERS = {
+    "log": analyze_log,
+    "telemetry": analyze_telemetry,
+    "letter": analyze_letter,
+}
+
+
+def analyze(item: Tuple[str, str]) -> Tuple[str, Stats]:
+    path, kind = item
+    return path, ANALYZERS[kind](path)
+
+
+def new_stats() -> Stats:
+    return {"malfunctions": {}, "achievements": {}}
+
+
+def add_sample(stats: Stats, name: str, value: float):
+    """记录可合并的样本汇总: 总和、个数、最小值、最大值"""
+    stats[f"{name}_sum"] = stats.get(f"{name}_sum", 0.0) + value
+    stats[f"{name}_count"] = stats.get(f"{name}_count", 0) + 1
+    stats[f"{name}_min"] = min(stats.get(f"{name}_min", value), value)
+    stats[f"{name}_max"] = max(stats.get(f"{name}_max", value), value)
+
+
+def merge(total: Stats, stats: Stats):
+    """合并中间结果: *_min / *_max 取极值，其余相加"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            merge(total.setdefault(key, {}), value)
+        elif key not in total:
+            total[key] = value
+        elif key.endswith("_min"):
+            total[key] = min(total[key], value)
+        elif key.endswith("_max"):
+            total[key] = max(total[key], value)
+        else:
+            total[key] += value
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"version": STATE_VERSION, "files": {}}
+    if state.get("version") != STATE_VERSION:
+        return {"version": STATE_VERSION, "files": {}}
+    return state
+
+
+def save_state(path: str, state: Dict[str, Any]):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def run(root: str, state_path: str, jobs: int = 1, full: bool = False) -> Tuple[Stats, int, int]:
+    """统计 root 下所有文件，返回 (汇总, 文件总数, 本次处理的文件数)"""
+    state = {"version": STATE_VERSION, "files": {}} if full else load_state(state_path)
+    previous = state["files"]
+    files = {}
+    pending = []
+    for path, kind in discover(root):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        signature = [st.st_mtime_ns, st.st_size]
+        cached = previous.get(path)
+        if cached is not None and cached["signature"] == signature:
+            files[path] = cached
+        else:
+            files[path] = {"kind": kind, "signature": signature}
+            pending.append((path, kind))
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(analyze, pending, chunksize=max(1, len(pending) // (jobs * 4)))
+            for path, stats in results:
+                files[path]["stats"] = stats
+    else:
+        for path, stats in map(analyze, pending):
+            files[path]["stats"] = stats
+
+    # 已删除的文件不再保留在状态中
+    state["files"] = files
+    save_state(state_path, state)
+
+    total = new_stats()
+    for entry in files.values():
+        merge(total, entry["stats"])
+    return total, len(files), len(pending)
+
+
+def mean(stats: Stats, name: str):
+    count = stats.get(f"{name}_count", 0)
+    return stats[f"{name}_sum"] / count if count else None
+
+
+def report(stats: Stats) -> Dict[str, Any]:
+    sessions = stats.get("sessions", 0)
+    light_years = stats.get("light_years", 0.0)
+    malfunctions = sum(stats["malfunctions"].values())
+    return {
+        "sessions": sessions,
+        "warp_rate": stats.get("warp_sessions", 0) / sessions if sessions else None,
+        "time_to_warp_mean_s": mean(stats, "time_to_warp"),
+        "time_to_warp_min_s": stats.get("time_to_warp_min"),
+        "malfunctions": malfunctions,
+        "malfunctions_per_session": malfunctions / sessions if sessions else None,
+        "malfunction_kinds": stats["malfunctions"],
+        "achievement_rates": {name: stats["achievements"].get(name, 0) / sessions
+                              for name in ACHIEVEMENT_NAMES} if sessions else {},
+        "flights": stats.get("flights", 0),
+        "telemetry_time_to_warp_mean_s": mean(stats, "telemetry_time_to_warp"),
+        "light_years": light_years,
+        "max_flight_light_years": stats.get("flight_light_years_max"),
+        "energy_per_light_year": stats.get("energy", 0.0) / light_years if light_years else None,
+        "letters": stats.get("letters", 0),
+        "invalid_files": stats.get("invalid_files", 0),
+    }
+
+
+def fmt(value, spec: str = ".2f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多会话飞行数据统计")
+    parser.add_argument("root", nargs="?", default=os.path.expanduser("~/.fusion_game"),
+                        help="游戏目录或包含多个游戏目录的归档 (默认 ~/.fusion_game)")
+    parser.add_argument("--jobs", type=int, default=1, help="并行进程数 (默认 1)")
+    parser.add_argument("--state", help=f"增量状态文件 (默认 <root>/{STATE_FILE})")
+    parser.add_argument("--full", action="store_true", help="忽略上次结果，重新处理所有文件")
+    parser.add_argument("--json", help="统计结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"目录不存在: {args.root}")
+
+    stats, total_files, processed = run(args.root, args.state or os.path.join(args.root, STATE_FILE),
+                                        args.jobs, args.full)
+    result = report(stats)
+
+    print(f"文件: {total_files}  本次处理: {processed}")
+    print(f"会话: {result['sessions']}  进入曲率驱动比例: {fmt(result['warp_rate'], '.1%')}  "
+          f"平均耗时: {fmt(result['time_to_warp_mean_s'], '.1f')} 秒")
+    print(f"故障: {result['malfunctions']}  每会话: {fmt(result['malfunctions_per_session'])}")
+    for kind, count in sorted(result["malfunction_kinds"].items(), key=lambda item: -item[1]):
+        print(f"  {kind}: {count}")
+    print(f"遥测飞行: {result['flights']}  总航程: {result['light_years']:.6f} 光年  "
+          f"每光年能耗: {fmt(result['energy_per_light_year'], '.4e')}")
+    print(f"CPSNA 感谢信: {result['letters']}")
+    if result["achievement_rates"]:
+        print("成就获得率:")
+        for name, rate in result["achievement_rates"].items():
+            print(f"  {name}: {rate:.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
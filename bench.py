@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟核心基准测试
+
+测量无界面模式下的命令吞吐、物理更新速率、面板渲染、日志写入、
+启动到首帧的耗时以及完整的发射到曲率驱动流程，结果以 JSON 输出并可与基线比较。
+
+    python3 bench.py                          # 运行并输出 JSON
+    python3 bench.py --save-baseline base.json
+    python3 bench.py --baseline base.json     # 退化超过阈值时返回 1
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import argparse
+import statistics
+import contextlib
+from datetime import datetime
+from typing import Callable, Dict, Any
+
+from main import FusionGame, BufferSink, WARP_SCRIPT
+
+
+def new_game(game_dir: str, output=None) -> FusionGame:
+    game = FusionGame(headless=True, game_dir=game_dir, output=output)
+    game.PORT_DETACHED = True
+    game.IN_PORT = False
+    return game
+
+
+def measure(setup: Callable[[], Callable[[], None]], ops: int, rounds: int) -> Dict[str, Any]:
+    """每轮调用 setup 得到被测函数并执行 ops 次，返回吞吐统计"""
+    timings = []
+    for _ in range(rounds):
+        func = setup()
+        start = time.perf_counter()
+        for _ in range(ops):
+            func()
+        timings.append(time.perf_counter() - start)
+    per_op = [t / ops for t in timings]
+    return {
+        "ops": ops,
+        "rounds": rounds,
+        "ops_per_sec": ops / min(timings),
+        "mean_s": statistics.mean(per_op),
+        "stdev_s": statistics.stdev(per_op) if rounds > 1 else 0.0,
+        "min_s": min(per_op),
+    }
+
+
+def bench_command_dispatch(game_dir: str):
+    commands = [("ses", []), ("ly", []), ("status", []), ("ca", ["2"]), ("tr", ["1:3"]), ("openleiden", [])]
+
+    def setup():
+        game = new_game(game_dir)
+        state = {"i": 0}
+
+        def run():
+            cmd, args = commands[state["i"] % len(commands)]
+            state["i"] += 1
+            game.process_command(cmd, args)
+        return run
+    return setup
+
+
+def bench_physics_tick(game_dir: str):
+    def setup():
+        game = new_game(game_dir)
+        game.CURVATURE_DRIVE_ACTIVE = True
+        game.SPEED_C = 3.0
+
+        def run():
+            game.update_time()
+            game.update_position()
+        return run
+    return setup
+
+
+def bench_render(game_dir: str):
+    def setup():
+        sink = BufferSink()
+        game = new_game(game_dir, sink)
+        game.add_achievement("山姆大叔需要你！")
+        game.add_achievement("太阳系穿越者")
+        game.MALFUNCTION = "能量过载风险"
+
+        def run():
+            game.show_panel()
+            sink.reset()
+        return run
+    return setup
+
+
+def bench_log_event(game_dir: str):
+    def setup():
+        game = new_game(game_dir)
+        return lambda: game.log_event("基准测试: 日志写入")
+    return setup
+
+
+def bench_startup(game_dir: str):
+    def setup():
+        def run():
+            game = FusionGame(headless=True, game_dir=game_dir, output=BufferSink())
+            game.update_time()
+            game.update_position()
+            game.publish_frame()
+            game.show_panel()
+        return run
+    return setup
+
+
+def bench_launch_to_warp(game_dir: str):
+    def setup():
+        def run():
+            game = FusionGame(headless=True, game_dir=game_dir)
+            game.run_script(WARP_SCRIPT[:-1])
+            # 曲率驱动只能在太阳系外启动，直接把飞船放到禁区之外，不计常规航行的耗时
+            game.DISTANCE_KM = game.SOLAR_SYSTEM_RADIUS_KM
+            game.run_script(WARP_SCRIPT[-1:])
+            if not game.CURVATURE_DRIVE_ACTIVE:
+                raise RuntimeError(f"未能进入曲率驱动: {game.MALFUNCTION}")
+        return run
+    return setup
+
+
+BENCHMARKS = {
+    "command_dispatch": (bench_command_dispatch, 5000),
+    "physics_tick": (bench_physics_tick, 50000),
+    "render_panel": (bench_render, 2000),
+    "log_event": (bench_log_event, 5000),
+    "startup": (bench_startup, 500),
+    "launch_to_warp": (bench_launch_to_warp, 100),
+}
+
+
+def run_benchmarks(names, rounds: int, scale: float) -> Dict[str, Any]:
+    game_dir = tempfile.mkdtemp(prefix="fusion_bench_")
+    results = {}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for name in names:
+                factory, ops = BENCHMARKS[name]
+                results[name] = measure(factory(game_dir), max(1, int(ops * scale)), rounds)
+    finally:
+        shutil.rmtree(game_dir, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """与基线比较吞吐，返回是否无退化"""
+    ok = True
+    comparison = {}
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["ops_per_sec"] / base["ops_per_sec"]
+        regressed = ratio < 1 - tolerance
+        ok = ok and not regressed
+        comparison[name] = {"baseline_ops_per_sec": base["ops_per_sec"], "ratio": ratio, "regressed": regressed}
+    report["comparison"] = comparison
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fusion Game 基准测试")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"要运行的基准 (默认全部): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--rounds", type=int, default=5, help="每项重复轮数 (默认 5)")
+    parser.add_argument("--scale", type=float, default=1.0, help="每轮操作数倍率")
+    parser.add_argument("--output", help="JSON 结果写入文件 (默认输出到终端)")
+    parser.add_argument("--baseline", help="与此基线 JSON 比较")
+    parser.add_argument("--save-baseline", help="将结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="允许的吞吐下降比例 (默认 0.15)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知基准: {', '.join(unknown)}")
+    
+    report = run_benchmarks(args.benchmarks or list(BENCHMARKS), args.rounds, args.scale)
+    
+    ok = True
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            ok = compare(report, json.load(f), args.tolerance)
+    
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    
+    if not ok:
+        regressed = [name for name, c in report["comparison"].items() if c["regressed"]]
+        print(f"性能退化: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
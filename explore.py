@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发射流程状态空间探索
+
+在无界面模式下广度优先枚举命令序列，按规范化状态去重，
+报告所有可达状态、可获得的成就、异常路径，以及无法再进入曲率驱动的死局。
+
+    python3 explore.py --depth 15
+    python3 explore.py --depth 12 --json report.json
+
+规范化状态只保留各命令判断条件读取的字段 (航行距离只保留所在区域，
+能量只保留是否达到灌注阈值)，成就在转移时单独记录，因此每个状态只需
+展开一次，探索图在有限步内闭合。--exact 则按全部可见字段去重。
+
+每条命令之前与交互模式一样推进一帧 (FusionGame.tick)，因此位置随航行变化，
+曲率驱动的区域限制与实际游玩一致。
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+import contextlib
+from collections import deque
+from typing import Dict, List, Tuple, Any
+
+from main import FusionGame, SHIP_STATE_FIELDS, ACHIEVEMENT_BITS
+
+# 探索使用的命令及参数
+DEFAULT_COMMANDS = (
+    "pre", "pre 50 10000", "foli 2000 1:2", "drive a",
+    "pfe 50 10000", "sfe", "openleiden", "ses", "f 100", "f 200",
+    "clock", "unclock", "ccu", "ac", "hc", "sr", "SR",
+    "pi 10", "pi 100", "tr 1:3", "m+ ture", "m- ture",
+    "Heim", "drive", "sas", "ca 2", "year",
+)
+
+# 各命令的判断条件所读取的字段；默认按这些字段去重，
+# 其余字段 (状态文字、扭矩比、温度等) 只用于显示，不改变之后的流程
+GATING_FIELDS = (
+    "IN_PORT", "PORT_DETACHED", "FOLI_CONFIGURED", "FUSION_ENGINE_ON", "ENERGY_STORAGE_ON",
+    "MAIN_FUSION_ON", "CLOCK_LOCKED", "AC_ACTIVATED", "HC_ACTIVATED", "HAROLD_COMP",
+    "RICHARD_RING", "NEGATIVE_FIELD_ON", "POSITIVE_FIELD_ON", "HEIM_BUBBLE_ON",
+    "CURVATURE_DRIVE_ACTIVE", "POSITION", "SPEED_C", "ENERGY_CONSUMED", "FUSION_COMMAND_COUNT",
+)
+
+# 精确模式下也不参与去重的字段 (成就只在转移时记录)
+IGNORED_FIELDS = {
+    "EARTH_TIME", "SHIP_TIME", "DISTANCE_KM", "DISTANCE_AU", "LIGHT_YEARS_TRAVELED",
+    "LATITUDE", "TOTAL_ENERGY_CONSUMED", "AGENT_NAME", "COMMAND_COUNT", "ACHIEVEMENT_MASK",
+}
+EXACT_FIELDS = tuple(name for name in SHIP_STATE_FIELDS if name not in IGNORED_FIELDS)
+
+# 只有是否达到阈值才影响流程的字段
+THRESHOLDS = {
+    "ENERGY_CONSUMED": 100000000000000,  # m+ 所需能量灌注
+    "FUSION_COMMAND_COUNT": 1,           # 首次启动聚变脉冲推进器成就
+}
+
+ENDED = ("ENDED",)
+
+
+def canonical(state: Dict[str, Any], fields: Tuple[str, ...] = GATING_FIELDS) -> tuple:
+    """规范化状态键"""
+    key = []
+    for name in fields:
+        value = state[name]
+        if name in THRESHOLDS:
+            value = value >= THRESHOLDS[name]
+        key.append(value)
+    return tuple(key)
+
+
+def is_warp(state: Dict[str, Any]) -> bool:
+    return state["CURVATURE_DRIVE_ACTIVE"]
+
+
+class Explorer:
+    def __init__(self, commands: Tuple[str, ...], game_dir: str, fields: Tuple[str, ...] = GATING_FIELDS):
+        self.commands = commands
+        self.fields = fields
+        self.game = FusionGame(headless=True, game_dir=game_dir, seed=0)
+        # 探索只考虑确定性流程
+        for name in self.game.EVENTS.rates:
+            self.game.EVENTS.set_rate(name, 0)
+        self.parsed = [self.game.parse_command(c)[:2] for c in commands]
+        
+        self.states = {}      # 键 -> 代表状态
+        self.progress = {}    # 键 -> 代表状态的规则进度与快照栈 (RULE_VALUES, RULES_FIRED, SNAPSHOTS)
+        self.depth = {}       # 键 -> 最短深度
+        self.parent = {}      # 键 -> (父键, 命令)
+        self.edges = {}       # 键 -> {后继键}
+        self.errors = []      # (路径, 命令, 异常)
+        self.achievements = {}
+
+    def path(self, key) -> List[str]:
+        steps = []
+        while key in self.parent:
+            key, command = self.parent[key]
+            steps.append(command)
+        return steps[::-1]
+
+    def step(self, state: Dict[str, Any], progress: tuple, index: int):
+        """从 state 执行第 index 条命令，返回新状态与规则进度"""
+        game = self.game
+        game.restore_state(state)
+        # 一次性规则是否已触发、clock 快照栈都属于各分支自己的进度，不能沿用上一个分支的
+        game.RULE_VALUES = dict(progress[0])
+        game.RULES_FIRED = progress[1]
+        game.SNAPSHOTS = list(progress[2])
+        game.tick()
+        cmd, args = self.parsed[index]
+        game.process_command(cmd, args)
+        return game.capture_state(), self.capture_progress()
+
+    def capture_progress(self) -> tuple:
+        game = self.game
+        return dict(game.RULE_VALUES), game.RULES_FIRED, list(game.SNAPSHOTS)
+
+    def run(self, max_depth: int):
+        initial = self.game.capture_state()
+        root = canonical(initial, self.fields)
+        self.states[root] = initial
+        self.progress[root] = self.capture_progress()
+        self.depth[root] = 0
+        frontier = deque([root])
+        
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            while frontier:
+                key = frontier.popleft()
+                if self.depth[key] >= max_depth:
+                    continue
+                successors = self.edges.setdefault(key, set())
+                for index, command in enumerate(self.commands):
+                    try:
+                        state, progress = self.step(self.states[key], self.progress[key], index)
+                    except SystemExit:
+                        successors.add(ENDED)
+                        self.parent.setdefault(ENDED, (key, command))
+                        continue
+                    except Exception as e:
+                        self.errors.append((self.path(key), command, repr(e)))
+                        continue
+                    
+                    child = canonical(state, self.fields)
+                    successors.add(child)
+                    for achievement, bit in ACHIEVEMENT_BITS.items():
+                        if state["ACHIEVEMENT_MASK"] & bit and achievement not in self.achievements:
+                            self.achievements[achievement] = self.path(key) + [command]
+                    if child in self.states:
+                        continue
+                    self.states[child] = state
+                    self.progress[child] = progress
+                    self.depth[child] = self.depth[key] + 1
+                    self.parent[child] = (key, command)
+                    frontier.append(child)
+
+    def dead_ends(self) -> List[tuple]:
+        """已展开、但在探索图内无法再进入曲率驱动的状态"""
+        reverse = {}
+        for key, successors in self.edges.items():
+            for child in successors:
+                reverse.setdefault(child, set()).add(key)
+        
+        can_warp = {key for key, state in self.states.items() if is_warp(state)}
+        queue = deque(can_warp)
+        while queue:
+            for key in reverse.get(queue.popleft(), ()):
+                if key not in can_warp:
+                    can_warp.add(key)
+                    queue.append(key)
+        return [key for key in self.edges if key not in can_warp]
+
+    def report(self) -> Dict[str, Any]:
+        warp = [key for key, state in self.states.items() if is_warp(state)]
+        dead = self.dead_ends()
+        shortest_warp = min(warp, key=lambda k: self.depth[k]) if warp else None
+        return {
+            "states": len(self.states),
+            "expanded": len(self.edges),
+            "max_depth": max(self.depth.values()),
+            "warp_states": len(warp),
+            "shortest_warp": self.path(shortest_warp) if shortest_warp else None,
+            "game_over": self.path(ENDED) if ENDED in self.parent else None,
+            "achievements": self.achievements,
+            "dead_ends": len(dead),
+            "dead_end_examples": [self.path(key) for key in sorted(dead, key=lambda k: self.depth[k])[:10]],
+            "errors": [{"path": path, "command": command, "error": error}
+                       for path, command, error in self.errors],
+            "end_states": [
+                {
+                    "path": self.path(key),
+                    "ship_state": state["SHIP_STATE"],
+                    "position": state["POSITION"],
+                    "malfunction": state["MALFUNCTION"],
+                    "warp": is_warp(state),
+                }
+                for key, state in self.states.items() if key not in self.edges
+            ],
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="发射流程状态空间探索")
+    parser.add_argument("--depth", type=int, default=10, help="最大命令序列长度 (默认 10)")
+    parser.add_argument("--commands", help="命令列表文件，每行一条 (默认内置列表)")
+    parser.add_argument("--exact", action="store_true", help="按全部可见字段去重 (状态数大得多)")
+    parser.add_argument("--json", help="完整报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+    
+    commands = DEFAULT_COMMANDS
+    if args.commands:
+        with open(args.commands, 'r', encoding='utf-8') as f:
+            commands = tuple(line.strip() for line in f if line.strip())
+    
+    game_dir = tempfile.mkdtemp(prefix="fusion_explore_")
+    try:
+        explorer = Explorer(commands, game_dir, EXACT_FIELDS if args.exact else GATING_FIELDS)
+        explorer.run(args.depth)
+    finally:
+        shutil.rmtree(game_dir, ignore_errors=True)
+    report = explorer.report()
+    
+    print(f"可达状态: {report['states']}  已展开: {report['expanded']}  最大深度: {report['max_depth']}")
+    print(f"曲率驱动状态: {report['warp_states']}  死局状态: {report['dead_ends']}  异常: {len(report['errors'])}")
+    if report["shortest_warp"]:
+        print(f"最短曲率驱动流程: {' ; '.join(report['shortest_warp'])}")
+    if report["game_over"]:
+        print(f"游戏结束流程: {' ; '.join(report['game_over'])}")
+    print("成就:")
+    for name, path in report["achievements"].items():
+        print(f"  {name}: {' ; '.join(path)}")
+    for error in report["errors"][:10]:
+        print(f"异常: {' ; '.join(error['path'] + [error['command']])} -> {error['error']}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
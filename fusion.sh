@@ -4,6 +4,13 @@
 # 作者: 怡境梦呓
 # 版本: beta 0.5 公开测试版
 
+# 快速启动: 跳过开场画面和等待，直接进入终端
+for arg in "$@"; do
+    if [ "$arg" = "--fast-start" ]; then
+        cd "$(dirname "$0")" && exec python3 -m main "$@"
+    fi
+done
+
 clear
 
 # 显示艺术字
@@ -36,4 +43,4 @@ if ! command -v python3 &> /dev/null; then
 fi
 
 # 运行游戏
-python3 main.py
\ No newline at end of file
+python3 main.py "$@"
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令脚本模糊测试
+
+变异命令脚本，在进程内对全新的无界面 FusionGame 执行，按 main.py 内的
+分支 (行间跳转) 覆盖率引导语料进化。抛出异常的输入会被最小化后作为
+回归用例保存。
+
+    python3 fuzz.py --time 60
+    python3 fuzz.py --replay fuzz_findings    # 重新执行已保存的回归用例
+
+覆盖率通过 sys.settrace 采集 (开销更低的 sys.monitoring 需要 Python 3.12，而本项目
+支持 3.8+)，--no-coverage 关闭覆盖率可换取更高的执行速度。
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import traceback
+import contextlib
+from typing import List, Optional, Tuple
+
+import main
+from main import FusionGame, LogEntry, COMMAND_HANDLERS, WARP_SCRIPT, TELEMETRY_RECORD
+
+MAIN_FILE = main.__file__
+
+# 变异字典
+COMMAND_WORDS = tuple(COMMAND_HANDLERS)
+INTERESTING_TOKENS = (
+    "0", "1", "-1", "10", "50", "99", "100", "101", "150", "151", "999", "1000",
+    "10000", "50000", "50001", "2147483648", "1e3", "0.5", "nan", "inf", "-0",
+    "1:1", "1:3", "a:b", ":", "1:", "::", "ture", "true", "a", "", "on", "off",
+    "reset", "dump", "start", "stop",
+)
+
+# 会启动后台线程或全局分析器的命令，不参与模糊测试
+SKIPPED_COMMANDS = {"profile", "exit", "quit"}
+
+MAX_LINES = 24
+
+# 已修复问题的回归用例，作为初始语料每次都会执行
+REGRESSION_SCRIPTS = (
+    ["pre", "foli 99999999999999999999 1:2"],  # 温度超出遥测整数字段范围
+    ["pre", "ses", "f -9999999999999999"],     # 速度与能耗超出遥测整数字段范围
+)
+
+
+class CoverageTracer:
+    """记录 main.py 内的行间跳转"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.arcs = set()
+
+    def global_trace(self, frame, event, arg):
+        if frame.f_code.co_filename != self.filename:
+            return None
+        arcs = self.arcs
+        last = [-frame.f_code.co_firstlineno]
+        
+        def local_trace(frame, event, arg):
+            if event == "line":
+                line = frame.f_lineno
+                arcs.add((last[0], line))
+                last[0] = line
+            elif event == "return":
+                arcs.add((last[0], -frame.f_code.co_firstlineno))
+            return local_trace
+        return local_trace
+
+
+def crash_report(e: Exception, line: str) -> Tuple[str, str, str]:
+    frames = [f for f in traceback.extract_tb(e.__traceback__) if f.filename == MAIN_FILE]
+    where = f"{frames[-1].name}:{frames[-1].lineno}" if frames else "?"
+    return f"{type(e).__name__}@{where}", line, traceback.format_exc()
+
+
+def execute(script: List[str], game_dir: str, tracer: Optional[CoverageTracer]) -> Optional[Tuple[str, str, str]]:
+    """执行脚本，返回 (签名, 出错命令, 堆栈) 或 None"""
+    game = FusionGame(headless=True, game_dir=game_dir, seed=0)
+    # 每次执行都追加同一个飞行日志会让文件无限增长，且文件打开是主要开销
+    game.BUS.unsubscribe(LogEntry, game.write_log_entries)
+    if tracer is not None:
+        sys.settrace(tracer.global_trace)
+    line = ""
+    try:
+        for line in script:
+            cmd, args, _ = game.parse_command(line)
+            if not cmd or cmd in SKIPPED_COMMANDS:
+                continue
+            game.tick()
+            game.process_command(cmd, args)
+    except SystemExit:
+        return None
+    except Exception as e:
+        return crash_report(e, line)
+    finally:
+        if tracer is not None:
+            sys.settrace(None)
+    # 交互模式每帧都会录制遥测，最终状态必须能写入遥测记录 (不计入覆盖率)
+    try:
+        TELEMETRY_RECORD.pack(*game.telemetry_values())
+    except Exception as e:
+        return crash_report(e, line)
+    return None
+
+
+class Fuzzer:
+    def __init__(self, game_dir: str, seed: int, coverage: bool = True):
+        self.game_dir = game_dir
+        self.rng = random.Random(seed)
+        self.coverage = coverage
+        self.seen = set()
+        self.corpus = [list(WARP_SCRIPT)] + [list(script) for script in REGRESSION_SCRIPTS]
+        self.corpus += [[word] for word in COMMAND_WORDS]
+        self.crashes = {}
+        self.executions = 0
+
+    def random_line(self) -> str:
+        rng = self.rng
+        words = [rng.choice(COMMAND_WORDS)]
+        for _ in range(rng.choice((0, 1, 1, 2, 2, 3))):
+            words.append(rng.choice(INTERESTING_TOKENS))
+        return " ".join(words)
+
+    def mutate_line(self, line: str) -> str:
+        rng = self.rng
+        words = line.split() or [rng.choice(COMMAND_WORDS)]
+        choice = rng.randrange(5)
+        if choice == 0:
+            words[rng.randrange(len(words))] = rng.choice(INTERESTING_TOKENS)
+        elif choice == 1:
+            words.append(rng.choice(INTERESTING_TOKENS))
+        elif choice == 2 and len(words) > 1:
+            del words[rng.randrange(1, len(words))]
+        elif choice == 3:
+            i = rng.randrange(len(words))
+            word = words[i]
+            pos = rng.randrange(len(word) + 1)
+            words[i] = word[:pos] + rng.choice("0123456789:-.e ") + word[pos:]
+        else:
+            words[0] = rng.choice(COMMAND_WORDS)
+        return " ".join(words)
+
+    def mutate(self, script: List[str]) -> List[str]:
+        rng = self.rng
+        script = list(script)
+        for _ in range(rng.randint(1, 4)):
+            choice = rng.randrange(6)
+            if choice == 0 or not script:
+                script.insert(rng.randint(0, len(script)), self.random_line())
+            elif choice == 1:
+                del script[rng.randrange(len(script))]
+            elif choice == 2:
+                i = rng.randrange(len(script))
+                script[i] = self.mutate_line(script[i])
+            elif choice == 3:
+                i, j = rng.randrange(len(script)), rng.randrange(len(script))
+                script[i], script[j] = script[j], script[i]
+            elif choice == 4:
+                i = rng.randrange(len(script))
+                script.insert(i, script[i])
+            else:
+                other = rng.choice(self.corpus)
+                cut = rng.randint(0, len(script))
+                script = script[:cut] + other[rng.randint(0, len(other)):]
+        return script[:MAX_LINES]
+
+    def run_one(self, script: List[str]):
+        tracer = CoverageTracer(MAIN_FILE) if self.coverage else None
+        crash = execute(script, self.game_dir, tracer)
+        self.executions += 1
+        if tracer is not None and not tracer.arcs <= self.seen:
+            self.seen |= tracer.arcs
+            self.corpus.append(script)
+        if crash is not None:
+            signature = crash[0]
+            if signature not in self.crashes:
+                self.crashes[signature] = minimize(script, signature, self.game_dir)
+
+    def run(self, seconds: float, max_execs: Optional[int] = None):
+        for script in list(self.corpus):
+            self.run_one(script)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and (max_execs is None or self.executions < max_execs):
+            self.run_one(self.mutate(self.rng.choice(self.corpus)))
+
+
+def signature_of(script: List[str], game_dir: str) -> Optional[str]:
+    crash = execute(script, game_dir, None)
+    return crash[0] if crash else None
+
+
+def minimize(script: List[str], signature: str, game_dir: str) -> List[str]:
+    """删除行、删除参数，直到无法在保持同一异常的前提下继续缩小"""
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(script)):
+            candidate = script[:i] + script[i + 1:]
+            if signature_of(candidate, game_dir) == signature:
+                script = candidate
+                changed = True
+                break
+        if changed:
+            continue
+        for i, line in enumerate(script):
+            words = line.split()
+            for j in range(1, len(words)):
+                candidate = script[:i] + [" ".join(words[:j] + words[j + 1:])] + script[i + 1:]
+                if signature_of(candidate, game_dir) == signature:
+                    script = candidate
+                    changed = True
+                    break
+            if changed:
+                break
+    return script
+
+
+def save_findings(crashes, directory: str):
+    os.makedirs(directory, exist_ok=True)
+    for signature, script in crashes.items():
+        name = signature.replace("@", "_").replace(":", "_")
+        with open(os.path.join(directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"# {signature}\n")
+            f.write("\n".join(script) + "\n")
+
+
+def replay_findings(directory: str, game_dir: str) -> int:
+    """重新执行回归用例，返回仍然出错的数量"""
+    failing = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".txt"):
+            continue
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            script = [line.rstrip("\n") for line in f if not line.startswith("#")]
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            crash = execute(script, game_dir, None)
+        if crash:
+            failing += 1
+            print(f"❌ {name}: {crash[0]} (命令: {crash[1]})")
+        else:
+            print(f"✅ {name}")
+    return failing
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="命令脚本模糊测试")
+    parser.add_argument("--time", type=float, default=30, help="运行秒数 (默认 30)")
+    parser.add_argument("--execs", type=int, help="最多执行次数")
+    parser.add_argument("--seed", type=int, default=0, help="变异随机种子")
+    parser.add_argument("--no-coverage", action="store_true", help="不采集覆盖率 (纯随机变异，速度更快)")
+    parser.add_argument("--output", default="fuzz_findings", help="回归用例保存目录 (默认 fuzz_findings)")
+    parser.add_argument("--replay", metavar="DIR", help="重新执行目录中的回归用例")
+    args = parser.parse_args(argv)
+    
+    game_dir = tempfile.mkdtemp(prefix="fusion_fuzz_")
+    try:
+        if args.replay:
+            return 1 if replay_findings(args.replay, game_dir) else 0
+        
+        fuzzer = Fuzzer(game_dir, args.seed, coverage=not args.no_coverage)
+        start = time.monotonic()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fuzzer.run(args.time, args.execs)
+        elapsed = time.monotonic() - start
+    finally:
+        shutil.rmtree(game_dir, ignore_errors=True)
+    
+    print(f"执行: {fuzzer.executions} 次  ({fuzzer.executions / elapsed:.0f}/秒)  "
+          f"分支: {len(fuzzer.seen)}  语料: {len(fuzzer.corpus)}  异常: {len(fuzzer.crashes)}")
+    for signature, script in fuzzer.crashes.items():
+        print(f"  {signature}: {' ; '.join(script)}")
+    if fuzzer.crashes:
+        save_findings(fuzzer.crashes, args.output)
+        print(f"回归用例已保存至 {args.output}/")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,17 +1,1063 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
 import time
+STARTUP_CLOCK = time.perf_counter()  # 启动计时起点，到首次出现命令提示符为止
+STARTUP_TARGET_MS = 50
+
+import os
 import math
 import random
 import sys
+import mmap
+import struct
+import argparse
+import io
+import json
+import queue
 from datetime import datetime, timedelta
 import threading
-from typing import Dict, List, Any
+from functools import cached_property
+from typing import Dict, List, Any, Optional, Tuple, NamedTuple, TYPE_CHECKING
+
+# http.server、multiprocessing、cProfile 等模块只在启用对应功能时导入，缩短启动时间
+if TYPE_CHECKING:
+    from http.server import BaseHTTPRequestHandler
+
+# 物理常数
+SOLAR_SYSTEM_RADIUS_KM = 4.4879e9  # 30 AU in km
+OBSERVABLE_UNIVERSE_LY = 46500000000  # 46.5 billion light years
+AU_TO_KM = 149597870.7  # 1 AU in km
+LY_TO_KM = 9460730472580.8  # 1 light year in km
+
+# 推进命令参数范围
+PFE_POWER_RANGE = (1, 100)
+PFE_IMPULSE_RANGE = (1000, 50000)
+MAIN_FUSION_MAX_POWER = 150  # f 超过此功率发动机热锁死
+
+# 组件状态位 (按位编码)
+COMPONENT_FLAGS = (
+    "IN_PORT", "PORT_DETACHED", "HAS_LEFT_PORT", "FOLI_CONFIGURED",
+    "FUSION_ENGINE_ON", "LEIDEN_MODULE", "ENERGY_STORAGE_ON", "MAIN_FUSION_ON",
+    "CLOCK_LOCKED", "ALCUBIERRE_COMP", "HAROLD_COMP", "AC_ACTIVATED",
+    "HC_ACTIVATED", "RICHARD_RING", "CURVATURE_DRIVE_ACTIVE", "NEGATIVE_FIELD_ON",
+    "POSITIVE_FIELD_ON", "HEIM_BUBBLE_ON", "DRIVE_BALANCER_ON",
+)
+
+# 飞船状态字段，用于状态快照、恢复与状态空间探索
+SHIP_STATE_FIELDS = (
+    "COMMAND_COUNT", "FUSION_COMMAND_COUNT", "AGENT_NAME",
+    "SPEED", "SPEED_UNIT", "THRUSTER_POWER", "SPECIFIC_IMPULSE", "POSITION",
+    "EARTH_TIME", "SHIP_TIME", "SHIP_STATE", "MALFUNCTION", "FUSION_STATE",
+    "PREPROCESS_EVENT", "SPEED_C", "TORQUE_RATIO", "CONST_PHASE",
+    "FUSION_ENERGY", "ENERGY_CONSUMED", "TOTAL_ENERGY_CONSUMED",
+    "NEG_FIELD_PERCENT", "POS_FIELD_PERCENT", "BUBBLE_PERCENT", "LATITUDE",
+    "DISTANCE_KM", "LIGHT_YEARS_TRAVELED", "DISTANCE_AU", "TEMPERATURE",
+    "PRESSURE_RATIO", "ACHIEVEMENT_MASK",
+) + COMPONENT_FLAGS
+
+# 全部成就 (按位编码)
+ACHIEVEMENT_NAMES = (
+    "山姆大叔需要你！",
+    "fu*k！",
+    "路易十六是交叉感染死的",
+    "发动机！",
+    "太阳系穿越者",
+    "我喜欢这来自暴风雨前的沉浸",
+    "这是一个信封",
+    "前进，不择手段的前进！",
+)
+ACHIEVEMENT_BITS = {name: 1 << bit for bit, name in enumerate(ACHIEVEMENT_NAMES)}
+
+
+class Rule:
+    """声明式规则: fields 中任一字段变化时评估 condition，成立时授予成就或执行 action"""
+
+    def __init__(self, name: str, fields: Tuple[str, ...], condition, achievement: Optional[str] = None,
+                 action=None, once: bool = True):
+        self.name = name
+        self.fields = fields
+        self.condition = condition
+        self.achievement = achievement
+        self.action = action
+        self.once = once
+
+
+class RuleSet:
+    """按监听字段索引的规则集，每次只重新评估输入发生变化的规则"""
+
+    def __init__(self, rules: Tuple[Rule, ...]):
+        self.rules = rules
+        self.index = {}
+        for position, rule in enumerate(rules):
+            for field in rule.fields:
+                self.index.setdefault(field, []).append(position)
+        self.fields = tuple(self.index)
+
+    def seed(self, game: "FusionGame"):
+        """记录监听字段的初始取值，之后只有真正发生变化的字段才触发规则"""
+        game.RULE_VALUES = {field: getattr(game, field) for field in self.fields}
+
+    def changed_rules(self, game: "FusionGame") -> List[int]:
+        """比较监听字段的上次取值，返回需要重新评估的规则"""
+        last = game.RULE_VALUES
+        positions = set()
+        for field in self.fields:
+            value = getattr(game, field)
+            if field not in last or last[field] != value:
+                last[field] = value
+                positions.update(self.index[field])
+        return sorted(positions)
+
+    def evaluate(self, game: "FusionGame"):
+        for position in self.changed_rules(game):
+            rule = self.rules[position]
+            bit = 1 << position
+            if rule.once and game.RULES_FIRED & bit:
+                continue
+            if rule.achievement is not None and game.ACHIEVEMENT_MASK & ACHIEVEMENT_BITS[rule.achievement]:
+                continue
+            if not rule.condition(game):
+                continue
+            if rule.once:
+                game.RULES_FIRED |= bit
+            if rule.achievement is not None:
+                game.add_achievement(rule.achievement)
+            if rule.action is not None:
+                rule.action(game)
+
+
+# 成就与触发事件规则
+RULES = RuleSet((
+    Rule("首条命令", ("COMMAND_COUNT",), lambda g: g.COMMAND_COUNT >= 1,
+         achievement="山姆大叔需要你！"),
+    Rule("第十条命令", ("COMMAND_COUNT",), lambda g: g.COMMAND_COUNT >= 10,
+         achievement="fu*k！"),
+    Rule("首次启动聚变脉冲推进器", ("FUSION_COMMAND_COUNT",), lambda g: g.FUSION_COMMAND_COUNT >= 1,
+         achievement="路易十六是交叉感染死的"),
+    Rule("发动机热锁死", ("MALFUNCTION",), lambda g: g.MALFUNCTION == "发动机热锁死",
+         achievement="发动机！"),
+    Rule("穿越太阳系", ("DISTANCE_KM",), lambda g: g.DISTANCE_KM >= g.SOLAR_SYSTEM_RADIUS_KM,
+         achievement="太阳系穿越者"),
+    Rule("曲率驱动冷却", ("PREPROCESS_EVENT",), lambda g: g.PREPROCESS_EVENT == "冷却程序中",
+         achievement="我喜欢这来自暴风雨前的沉浸"),
+    Rule("进入超光速", ("CURVATURE_DRIVE_ACTIVE",), lambda g: g.CURVATURE_DRIVE_ACTIVE,
+         achievement="这是一个信封"),
+    Rule("超光速航行百光年", ("CURVATURE_DRIVE_ACTIVE", "LIGHT_YEARS_TRAVELED"),
+         lambda g: g.CURVATURE_DRIVE_ACTIVE and g.LIGHT_YEARS_TRAVELED > 100,
+         achievement="前进，不择手段的前进！"),
+    Rule("区域变化", ("POSITION",), lambda g: True,
+         action=lambda g: g.BUS.publish(RegionCrossed(g.POSITION)), once=False),
+))
+
+# 遥测记录格式: 文件头 + 定长记录，便于内存映射与按下标定位
+TELEMETRY_MAGIC = b"FTLM"
+TELEMETRY_VERSION = 1
+TELEMETRY_HEADER = struct.Struct("<4sHHd")  # 魔数, 版本, 记录长度, 开始时间
+TELEMETRY_FIELDS = (
+    ("TIMESTAMP", "d"),
+    ("EARTH_TIME", "d"),
+    ("SHIP_TIME", "d"),
+    ("SPEED", "q"),
+    ("SPEED_C", "d"),
+    ("THRUSTER_POWER", "q"),
+    ("SPECIFIC_IMPULSE", "q"),
+    ("DISTANCE_KM", "d"),
+    ("FUSION_ENERGY", "q"),
+    ("ENERGY_CONSUMED", "q"),
+    ("TOTAL_ENERGY_CONSUMED", "d"),
+    ("TEMPERATURE", "q"),
+    ("COMPONENTS", "I"),
+    ("ACHIEVEMENT_MASK", "I"),
+    ("SPEED_UNIT", "8s"),
+    ("SHIP_STATE", "48s"),
+    ("FUSION_STATE", "16s"),
+    ("MALFUNCTION", "64s"),
+    ("PREPROCESS_EVENT", "32s"),
+    ("POSITION", "48s"),
+    ("LATITUDE", "48s"),
+    ("TORQUE_RATIO", "16s"),
+    ("PRESSURE_RATIO", "16s"),
+    ("CONST_PHASE", "8s"),
+    ("NEG_FIELD_PERCENT", "12s"),
+    ("POS_FIELD_PERCENT", "12s"),
+    ("BUBBLE_PERCENT", "12s"),
+)
+TELEMETRY_RECORD = struct.Struct("<" + "".join(fmt for _, fmt in TELEMETRY_FIELDS))
+TELEMETRY_INT_RANGE = {"q": (-2 ** 63, 2 ** 63 - 1), "I": (0, 2 ** 32 - 1)}
+
+
+def saturate(value, fmt: str) -> int:
+    """将数值饱和到遥测整数字段的取值范围 (命令参数不限大小，超界时取边界值)"""
+    low, high = TELEMETRY_INT_RANGE[fmt]
+    if value != value:  # NaN
+        return 0
+    if value <= low:
+        return low
+    if value >= high:
+        return high
+    return int(value)
+
+
+class OutputSink:
+    """输出层: 所有面板与剧情文字都写入输出层，由具体实现决定如何呈现"""
+
+    enabled = True      # 为 False 时面板等纯展示内容直接跳过
+    typewriter = False  # 是否逐字显示
+
+    def write(self, text: str):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        pass
+
+
+class TTYSink(OutputSink):
+    """终端输出: 写入先缓冲，在等待、输入前或每帧结束时一次性写出"""
+
+    CLEAR = "\033[H\033[2J\033[3J"
+
+    def __init__(self, typewriter: bool = True):
+        self.typewriter = typewriter
+        self.buffer = []
+
+    def write(self, text: str):
+        self.buffer.append(text)
+
+    def flush(self):
+        if self.buffer:
+            sys.stdout.write("".join(self.buffer))
+            self.buffer.clear()
+        sys.stdout.flush()
+
+    def clear(self):
+        if os.name == 'nt':
+            self.flush()
+            os.system('cls')
+        else:
+            self.write(self.CLEAR)
+
+
+class BufferSink(OutputSink):
+    """内存输出，用于测试与服务端"""
 
-class FusionGame:
     def __init__(self):
+        self.parts = []
+
+    def write(self, text: str):
+        self.parts.append(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+    def reset(self):
+        self.parts.clear()
+
+
+class NullSink(OutputSink):
+    """丢弃全部输出，用于基准测试与无界面运行"""
+
+    enabled = False
+
+    def write(self, text: str):
+        pass
+
+
+class TelemetryRecorder:
+    """飞行遥测记录器，每帧追加一条定长记录"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'wb')
+        self.file.write(TELEMETRY_HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION,
+                                              TELEMETRY_RECORD.size, time.time()))
+        self.file.flush()
+
+    def record(self, values: tuple):
+        """写入一帧"""
+        self.file.write(TELEMETRY_RECORD.pack(*values))
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class TelemetryReplay:
+    """飞行遥测回放，内存映射录制文件，按时间戳二分定位"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < TELEMETRY_HEADER.size:
+            raise ValueError(f"不是有效的遥测文件: {path}")
+        magic, version, record_size, self.start_time = TELEMETRY_HEADER.unpack_from(self.map, 0)
+        if magic != TELEMETRY_MAGIC or version != TELEMETRY_VERSION or record_size != TELEMETRY_RECORD.size:
+            raise ValueError(f"不是有效的遥测文件: {path}")
+        # 末尾残缺的记录(录制中断)直接忽略
+        self.count = (len(self.map) - TELEMETRY_HEADER.size) // TELEMETRY_RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.map.close()
+
+    def offset(self, index: int) -> int:
+        return TELEMETRY_HEADER.size + index * TELEMETRY_RECORD.size
+
+    def timestamp(self, index: int) -> float:
+        """第 index 帧的录制时间 (只读取首字段)"""
+        return struct.unpack_from("<d", self.map, self.offset(index))[0]
+
+    def seek(self, timestamp: float, lo: int = 0) -> int:
+        """返回录制时间不晚于 timestamp 的最后一帧下标"""
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return max(0, lo - 1)
+
+    def frame(self, index: int) -> tuple:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return TELEMETRY_RECORD.unpack_from(self.map, self.offset(index))
+
+    def frames(self, start: int = 0):
+        """顺序迭代各帧，不整体读入内存"""
+        for index in range(start, self.count):
+            yield TELEMETRY_RECORD.unpack_from(self.map, self.offset(index))
+
+    def play(self, game: "FusionGame", speed: float = 1.0, start: int = 0, max_fps: float = 30.0):
+        """按倍速回放，终端跟不上时跳过中间帧"""
+        if not 1 <= speed <= 10000:
+            raise ValueError("回放倍速必须在 1-10000 之间")
+        if start >= self.count:
+            return 0
+        
+        frame_interval = 1.0 / max_fps
+        first_time = self.timestamp(start)
+        wall_start = time.monotonic()
+        index = start
+        skipped = 0
+        while True:
+            game.apply_telemetry_frame(self.frame(index))
+            game.show_panel()
+            game.echo(f"回放: {index + 1}/{self.count}  倍速: {speed:g}×  "
+                      f"已跳帧: {skipped}  录制时间: {datetime.fromtimestamp(self.timestamp(index))}")
+            game.OUTPUT.flush()
+            rendered = time.monotonic()
+            
+            if index + 1 >= self.count:
+                break
+            
+            # 等待下一帧到期，且不超过最大刷新率
+            due = wall_start + (self.timestamp(index + 1) - first_time) / speed
+            wait = max(due, rendered + frame_interval) - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            
+            # 定位到此刻应显示的最新一帧，中间帧跳过
+            now_in_recording = first_time + (time.monotonic() - wall_start) * speed
+            latest = max(index + 1, self.seek(now_in_recording, index + 1))
+            skipped += latest - index - 1
+            index = latest
+        return skipped
+
+
+# 状态编码表，共享内存中以下标表示，未知状态为 STATE_UNKNOWN
+STATE_UNKNOWN = 0xFFFF
+SHIP_STATES = ("未启动", "氢氦聚变推进", "启动聚变脉冲推进器中", "常规推进",
+               "预曲率驱动", "曲率驱动中", "停滞", "测定时间")
+FUSION_STATES = ("关闭", "运行中")
+MALFUNCTIONS = ("无", "推进零件故障(概率事件)", "能量过载风险", "发动机热锁死", "违法启动曲率驱动")
+POSITIONS = ("地球", "地球轨道", "地月系统", "太阳系内", "近太阳系区域【危险】",
+             "外太空地区猎户座左旋臂", "深空")
+
+# 共享内存布局: 序列号(seqlock) + 定长数值状态
+SHARED_STATE_NAME = "fusion_game_state"
+SHARED_STATE_MAGIC = b"FSHM"
+SHARED_STATE_VERSION = 1
+SHARED_STATE_HEADER = struct.Struct("<4sHxxQ")  # 魔数, 版本, 序列号
+SHARED_STATE_SEQ_OFFSET = 8
+SHARED_STATE_FIELDS = (
+    "UPDATED", "SPEED", "SPEED_C", "DISTANCE_KM", "THRUSTER_POWER", "SPECIFIC_IMPULSE",
+    "FUSION_ENERGY", "ENERGY_CONSUMED", "TOTAL_ENERGY_CONSUMED",
+    "COMPONENTS", "ACHIEVEMENT_MASK",
+    "SHIP_STATE", "FUSION_STATE", "MALFUNCTION", "POSITION",
+)
+SHARED_STATE_PAYLOAD = struct.Struct("<dddddddddIIHHHH")
+SHARED_STATE_SIZE = SHARED_STATE_HEADER.size + SHARED_STATE_PAYLOAD.size
+
+
+def state_code(table: tuple, value: str) -> int:
+    try:
+        return table.index(value)
+    except ValueError:
+        return STATE_UNKNOWN
+
+
+class SharedStateWriter:
+    """将飞船数值状态发布到共享内存，读者通过 seqlock 无锁读取"""
+
+    def __init__(self, name: str = SHARED_STATE_NAME):
+        from multiprocessing import shared_memory
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SHARED_STATE_SIZE)
+        except FileExistsError:
+            # 上次异常退出残留的共享内存，直接复用
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.size < SHARED_STATE_SIZE:
+                self.shm.close()
+                raise ValueError(f"共享内存 {name} 大小不符")
+        self.seq = 0
+        SHARED_STATE_HEADER.pack_into(self.shm.buf, 0, SHARED_STATE_MAGIC, SHARED_STATE_VERSION, self.seq)
+
+    def publish(self, values: tuple):
+        buf = self.shm.buf
+        # 写入期间序列号为奇数，读者据此重试
+        self.seq += 1
+        struct.pack_into("<Q", buf, SHARED_STATE_SEQ_OFFSET, self.seq)
+        SHARED_STATE_PAYLOAD.pack_into(buf, SHARED_STATE_HEADER.size, *values)
+        self.seq += 1
+        struct.pack_into("<Q", buf, SHARED_STATE_SEQ_OFFSET, self.seq)
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedStateReader:
+    """共享内存状态读者，可由任意数量的本地进程高频采样"""
+
+    def __init__(self, name: str = SHARED_STATE_NAME):
+        from multiprocessing import shared_memory, resource_tracker
+        self.shm = shared_memory.SharedMemory(name=name)
+        # 读者不拥有共享内存，避免退出时被资源跟踪器删除
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        magic, _, _ = SHARED_STATE_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != SHARED_STATE_MAGIC:
+            self.shm.close()
+            raise ValueError(f"共享内存 {name} 不是飞船状态")
+
+    def read(self) -> Dict[str, Any]:
+        """读取一致的状态快照"""
+        buf = self.shm.buf
+        while True:
+            seq = struct.unpack_from("<Q", buf, SHARED_STATE_SEQ_OFFSET)[0]
+            if seq & 1:
+                continue
+            values = SHARED_STATE_PAYLOAD.unpack_from(buf, SHARED_STATE_HEADER.size)
+            if struct.unpack_from("<Q", buf, SHARED_STATE_SEQ_OFFSET)[0] == seq:
+                state = dict(zip(SHARED_STATE_FIELDS, values))
+                state["SEQ"] = seq
+                return state
+
+    def close(self):
+        self.shm.close()
+
+
+# 事件总线上的事件类型
+class LogEntry(NamedTuple):
+    timestamp: str
+    message: str
+
+
+class AchievementEarned(NamedTuple):
+    name: str
+
+
+class ComponentStarted(NamedTuple):
+    component: str
+
+
+class SpeedChanged(NamedTuple):
+    speed: float
+    speed_c: float
+
+
+class RegionCrossed(NamedTuple):
+    position: str
+
+
+class Malfunction(NamedTuple):
+    description: str
+    random: bool
+
+
+class CommandExecuted(NamedTuple):
+    command: str
+    args: tuple
+
+
+class FrameUpdated(NamedTuple):
+    pass
+
+
+FRAME_UPDATED = FrameUpdated()
+
+
+class EventBus:
+    """轻量发布/订阅总线
+
+    普通订阅者在发布时同步调用；批量订阅者接收事件列表，
+    start() 之后由后台线程批量异步投递，慢速消费者 (如磁盘写入) 不再阻塞命令。
+    """
+
+    BATCH_SIZE = 256
+
+    def __init__(self):
+        self.subscribers = {}
+        self.batched = {}
+        self.queue = None
+        self.worker = None
+
+    def subscribe(self, event_type: type, handler, batched: bool = False):
+        table = self.batched if batched else self.subscribers
+        table.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type: type, handler):
+        for table in (self.subscribers, self.batched):
+            if handler in table.get(event_type, ()):
+                table[event_type].remove(handler)
+
+    def publish(self, event):
+        event_type = type(event)
+        for handler in self.subscribers.get(event_type, ()):
+            handler(event)
+        if event_type in self.batched:
+            if self.queue is None:
+                for handler in self.batched[event_type]:
+                    handler([event])
+            else:
+                self.queue.put(event)
+
+    def start(self):
+        """切换为异步批量投递"""
+        if self.worker is not None:
+            return
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
+        self.worker.start()
+
+    def run_worker(self):
+        while True:
+            events = [self.queue.get()]
+            while len(events) < self.BATCH_SIZE:
+                try:
+                    events.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            grouped = {}
+            for event in events:
+                if event is not None:
+                    grouped.setdefault(type(event), []).append(event)
+            for event_type, batch in grouped.items():
+                for handler in self.batched.get(event_type, ()):
+                    try:
+                        handler(batch)
+                    except Exception as e:
+                        sys.stderr.write(f"事件处理失败 ({event_type.__name__}): {e}\n")
+            for _ in events:
+                self.queue.task_done()
+            if None in events:
+                return
+
+    def flush(self):
+        """等待已发布的事件投递完成"""
+        if self.queue is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.worker is not None:
+            self.queue.put(None)
+            self.worker.join()
+            self.worker = None
+            self.queue = None
+
+
+# 随机事件及每次判定的发生概率
+RANDOM_EVENTS = {
+    "推进零件故障": 0.01,
+}
+
+
+class EventScheduler:
+    """预先计算的随机事件调度器
+
+    每种事件按几何分布抽取下一次发生在第几次判定，
+    之后的判定只需比较计数，不再调用随机数生成器。
+    """
+
+    def __init__(self, rng: random.Random, rates: Dict[str, float]):
+        self.rng = rng
+        self.rates = {}
+        self.trials = {}
+        self.next_event = {}
+        for name, rate in rates.items():
+            self.set_rate(name, rate)
+
+    def set_rate(self, name: str, rate: float):
+        """设置事件概率，并从当前判定次数重新安排下一次发生"""
+        self.rates[name] = rate
+        self.trials.setdefault(name, 0)
+        self.schedule(name)
+
+    def schedule(self, name: str):
+        rate = self.rates[name]
+        if rate <= 0:
+            self.next_event[name] = math.inf
+        elif rate >= 1:
+            self.next_event[name] = self.trials[name] + 1
+        else:
+            gap = 1 + int(math.log(1.0 - self.rng.random()) / math.log(1.0 - rate))
+            self.next_event[name] = self.trials[name] + gap
+
+    def trial(self, name: str) -> bool:
+        """进行一次判定，返回事件是否发生"""
+        self.trials[name] += 1
+        if self.trials[name] < self.next_event[name]:
+            return False
+        self.schedule(name)
+        return True
+
+    def getstate(self) -> tuple:
+        return self.rng.getstate(), dict(self.trials), dict(self.next_event)
+
+    def setstate(self, state: tuple):
+        rng_state, trials, next_event = state
+        self.rng.setstate(rng_state)
+        self.trials = dict(trials)
+        self.next_event = dict(next_event)
+
+
+class Snapshot(NamedTuple):
+    """clock 保存的状态快照
+
+    飞船状态字段都是不可变值，快照只记录这些值的引用，之后的修改都是
+    替换属性而不会改动快照中的对象，保存和恢复的开销与航行时长无关。
+    """
+    name: str
+    taken: datetime
+    state: Dict[str, Any]
+    rule_values: Dict[str, Any]
+    rules_fired: int
+    events: tuple
+
+
+# 最多保留的快照数，超出时丢弃最早的快照
+SNAPSHOT_LIMIT = 8
+
+
+# 从发射港到进入曲率驱动的标准流程
+WARP_SCRIPT = (
+    "pre",
+    "ses",
+    "f 100",
+    "ccu",
+    "ac",
+    "hc",
+    "pi 100",
+    "tr 1:3",
+    "m+ ture",
+    "m- ture",
+    "Heim",
+    "drive",
+)
+
+# 状态推送服务默认端口
+STREAM_PORT = 8765
+
+
+def torque_ratio(value: str) -> str:
+    if ":" not in value:
+        raise ValueError(value)
+    return value
+
+
+# 带参数命令可接受的参数形式 (用于管道与宏的预校验)
+# 字符串表示必须原样出现的关键字，其余为转换函数，转换失败即不匹配；未列出的命令不校验参数
+# 命令名 -> FusionGame 处理方法名
+COMMAND_HANDLERS = {
+    "pfe": "start_fusion_engine",
+    "sfe": "stop_fusion_engine",
+    "openleiden": "open_leiden_module",
+    "ses": "start_energy_storage",
+    "f": "start_main_fusion",
+    "clock": "lock_values",
+    "unclock": "unlock_values",
+    "rollback": "rollback",
+    "ly": "show_light_years",
+    "ccu": "cooling_curvature",
+    "ac": "start_alcubierre_component",
+    "hc": "start_harold_component",
+    "sr": "start_richard_ring",
+    "SR": "stop_richard_ring",
+    "pi": "energy_pour_into",
+    "tr": "set_torque_ratio",
+    "m+": "start_negative_field",
+    "m-": "start_positive_field",
+    "Heim": "start_heim_bubble",
+    "drive": "start_curvature_drive",
+    "sas": "stop_all_systems",
+    "year": "detect_year",
+    "status": "show_detailed_status",
+    "log": "show_flight_log",
+    "help": "show_help",
+    "exit": "exit_game",
+    "quit": "exit_game",
+    "ca": "change_curvature",
+    "pre": "detach_port",
+    "foli": "configure_foli",
+    "perf": "show_perf",
+    "profile": "profile_command",
+    "macro": "macro_command",
+}
+
+COMMAND_ARGS = {
+    "pfe": ((int, int),),
+    "f": ((int,),),
+    "pi": ((int,),),
+    "tr": ((torque_ratio,),),
+    "m+": (("ture",),),
+    "m-": (("ture",),),
+    "drive": ((), ("a",)),
+    "ca": ((float,),),
+    "pre": ((), (int, int)),
+    "foli": ((int, torque_ratio),),
+    "perf": ((), ("on",), ("off",), ("reset",), ("dump",), ("show",)),
+    "clock": ((), (str,)),
+    "unclock": ((), (str,)),
+    "rollback": ((), (str,)),
+}
+
+
+def match_args(shape: tuple, args: List[str]) -> bool:
+    """判断参数是否符合某一参数形式"""
+    if len(shape) != len(args):
+        return False
+    for spec, value in zip(shape, args):
+        if isinstance(spec, str):
+            if value != spec:
+                return False
+        else:
+            try:
+                spec(value)
+            except ValueError:
+                return False
+    return True
+
+
+# 宏文件扩展名，宏以 '@名称' 调用
+MACRO_EXT = ".macro"
+
+
+def valid_macro_name(name: str) -> bool:
+    """宏名称只允许标识符字符 (及 '-')，不能指向宏目录之外"""
+    return name.replace("-", "_").isidentifier()
+
+
+class StreamClient(queue.Queue):
+    """单个观察者的待发送队列，溢出时标记为需要重新同步"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self.resync = False
+
+
+class StateStreamServer:
+    """本地状态推送服务 (SSE)，只发送自上一帧以来变化的字段"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = STREAM_PORT, queue_size: int = 64):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.lock = threading.Lock()
+        self.state = {}
+        self.seq = 0
+        self.clients = set()
+        self.queue_size = queue_size
+        self.closed = False
+        
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def encode(self, event: str, data: dict) -> bytes:
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return f"id: {self.seq}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8')
+
+    def publish(self, state: Dict[str, Any]):
+        """推送一帧状态，只编码变化的字段"""
+        with self.lock:
+            delta = {k: v for k, v in state.items() if k not in self.state or self.state[k] != v}
+            if not delta:
+                return
+            self.state.update(delta)
+            self.seq += 1
+            self.broadcast(self.encode("delta", delta))
+
+    def publish_event(self, event: NamedTuple):
+        """推送类型化事件 (部件启动、速度变化、故障等)"""
+        with self.lock:
+            self.seq += 1
+            self.broadcast(self.encode(type(event).__name__, event._asdict()))
+
+    def broadcast(self, message: bytes):
+        for client in self.clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # 慢速观察者: 丢弃积压的消息，追上后发送完整快照
+                client.resync = True
+
+    def snapshot(self, client: StreamClient) -> bytes:
+        with self.lock:
+            while not client.empty():
+                client.get_nowait()
+            client.resync = False
+            return self.encode("snapshot", self.state)
+
+    def handle(self, request: "BaseHTTPRequestHandler"):
+        path = request.path.split('?')[0]
+        if path == "/stream":
+            self.stream(request)
+        elif path == "/state":
+            with self.lock:
+                body = json.dumps(self.state, ensure_ascii=False).encode('utf-8')
+            request.send_response(200)
+            request.send_header("Content-Type", "application/json; charset=utf-8")
+            request.send_header("Content-Length", str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        else:
+            request.send_error(404)
+
+    def stream(self, request: "BaseHTTPRequestHandler"):
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        request.send_header("Cache-Control", "no-cache")
+        request.end_headers()
+        
+        client = StreamClient(self.queue_size)
+        with self.lock:
+            self.clients.add(client)
+        try:
+            message = self.snapshot(client)
+            while not self.closed:
+                request.wfile.write(message)
+                request.wfile.flush()
+                if client.resync:
+                    message = self.snapshot(client)
+                    continue
+                try:
+                    message = client.get(timeout=15)
+                except queue.Empty:
+                    message = b": keep-alive\n\n"
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.lock:
+                self.clients.discard(client)
+
+    def close(self):
+        self.closed = True
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LatencyHistogram:
+    """HDR 风格的对数线性直方图 (微秒)，每个2的幂区间64个子桶，精度约1.5%"""
+
+    SUB_BUCKET_BITS = 7
+    SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0
+
+    def bucket_index(self, value: int) -> int:
+        if value < (1 << self.SUB_BUCKET_BITS):
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        return shift * self.SUB_BUCKET_HALF + (value >> shift)
+
+    def bucket_upper(self, index: int) -> int:
+        """桶内最大等价值"""
+        if index < (1 << self.SUB_BUCKET_BITS):
+            return index
+        shift = index // self.SUB_BUCKET_HALF - 1
+        sub = index - shift * self.SUB_BUCKET_HALF
+        return ((sub + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1e6))
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        """返回百分位数 (秒)"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self.bucket_upper(index), self.max) / 1e6
+        return self.max / 1e6
+
+    def cumulative(self, bounds: Tuple[float, ...]) -> List[int]:
+        """各上界 (秒) 以下的累计计数，用于 Prometheus 导出"""
+        result = []
+        for bound in bounds:
+            limit = bound * 1e6
+            result.append(sum(c for i, c in self.counts.items() if self.bucket_upper(i) <= limit))
+        return result
+
+
+class CommandMetrics:
+    """按命令统计墙钟与CPU耗时，扣除剧情等待 (sleep) 与用户输入时间"""
+
+    PROMETHEUS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self, game: "FusionGame"):
+        self.game = game
+        self.wall = {}
+        self.cpu = {}
+
+    def measure(self, cmd: str, func, *args):
+        paused = self.game.PAUSED_TIME
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args)
+        finally:
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - wall_start - (self.game.PAUSED_TIME - paused)
+            if cmd not in self.wall:
+                self.wall[cmd] = LatencyHistogram()
+                self.cpu[cmd] = LatencyHistogram()
+            self.wall[cmd].record(max(0.0, wall))
+            self.cpu[cmd].record(cpu)
+
+    def reset(self):
+        self.wall.clear()
+        self.cpu.clear()
+
+    def report(self) -> str:
+        if not self.wall:
+            return "尚无命令耗时记录"
+        lines = [f"{'命令':<10}{'次数':>6}{'平均(ms)':>12}{'p50(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}{'CPU平均(ms)':>13}"]
+        for cmd in sorted(self.wall, key=lambda c: -self.wall[c].total):
+            wall, cpu = self.wall[cmd], self.cpu[cmd]
+            lines.append(f"{cmd:<10}{wall.count:>6}{wall.total / wall.count * 1e3:>12.3f}"
+                         f"{wall.percentile(50) * 1e3:>10.3f}{wall.percentile(99) * 1e3:>10.3f}"
+                         f"{wall.max / 1e3:>10.3f}{cpu.total / cpu.count * 1e3:>13.3f}")
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        for metric, histograms, text in (
+            ("fusion_command_wall_seconds", self.wall, "Command wall time excluding deliberate pauses"),
+            ("fusion_command_cpu_seconds", self.cpu, "Command CPU time"),
+        ):
+            lines.append(f"# HELP {metric} {text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for cmd in sorted(histograms):
+                hist = histograms[cmd]
+                label = cmd.replace('\\', '\\\\').replace('"', '\\"')
+                for bound, count in zip(self.PROMETHEUS_BUCKETS, hist.cumulative(self.PROMETHEUS_BUCKETS)):
+                    lines.append(f'{metric}_bucket{{command="{label}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{command="{label}",le="+Inf"}} {hist.count}')
+                lines.append(f'{metric}_sum{{command="{label}"}} {hist.total:.6f}')
+                lines.append(f'{metric}_count{{command="{label}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """低开销采样分析器，定期采样目标线程的调用栈，输出折叠栈 (flamegraph) 格式"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class FusionGame:
+    def __init__(self, headless: bool = False, game_dir: Optional[str] = None, seed: Optional[int] = None,
+                 output: Optional["OutputSink"] = None):
+        # 无界面模式: 不真正等待、默认丢弃输出，输入由 SCRIPTED_INPUT 提供
+        self.HEADLESS = headless
+        if output is None:
+            output = NullSink() if headless else TTYSink()
+        self.OUTPUT = output
+        self.SCRIPTED_INPUT = []
+        self.HEADLESS_ANSWER = "y"
+        
         # 游戏状态变量
         self.USER = "user"
         self.ADMIN_PASS = "admin123"
@@ -54,13 +1100,16 @@ class FusionGame:
         self.PRESSURE_RATIO = "1:1"
         
         # 物理常数
-        self.SOLAR_SYSTEM_RADIUS_KM = 4.4879e9  # 30 AU in km
-        self.OBSERVABLE_UNIVERSE_LY = 46500000000  # 46.5 billion light years
-        self.AU_TO_KM = 149597870.7  # 1 AU in km
-        self.LY_TO_KM = 9460730472580.8  # 1 light year in km
+        self.SOLAR_SYSTEM_RADIUS_KM = SOLAR_SYSTEM_RADIUS_KM
+        self.OBSERVABLE_UNIVERSE_LY = OBSERVABLE_UNIVERSE_LY
+        self.AU_TO_KM = AU_TO_KM
+        self.LY_TO_KM = LY_TO_KM
         
         # 成就系统
-        self.ACHIEVEMENTS = []
+        self.ACHIEVEMENT_MASK = 0
+        self.RULE_VALUES = {}  # 规则监听字段的上次取值
+        self.RULES_FIRED = 0   # 已触发的一次性规则
+        self.SNAPSHOTS: List[Snapshot] = []  # clock 快照栈，栈顶为最新
         
         # 引擎组件状态
         self.FUSION_ENGINE_ON = False
@@ -78,47 +1127,44 @@ class FusionGame:
         self.DRIVE_BALANCER_ON = False
         
         # 游戏设置
-        self.RANDOM_EVENT_CHANCE = 0.01
-        self.GAME_DIR = os.path.expanduser("~/.fusion_game")
+        self.SEED = seed if seed is not None else random.SystemRandom().randrange(1 << 32)
+        self.RNG = random.Random(self.SEED)
+        self.EVENTS = EventScheduler(self.RNG, RANDOM_EVENTS)
+        self.GAME_DIR = game_dir or os.path.expanduser("~/.fusion_game")
         self.SAVE_FILE = os.path.join(self.GAME_DIR, "savegame.dat")
         self.LOG_FILE = os.path.join(self.GAME_DIR, "flight_log.txt")
         self.CPSNA_FILE = os.path.join(self.GAME_DIR, "CPSNA.txt")
-        
-        # 创建游戏目录
-        os.makedirs(self.GAME_DIR, exist_ok=True)
-        
-        # 命令映射
-        self.COMMANDS = {
-            "pfe": self.start_fusion_engine,
-            "sfe": self.stop_fusion_engine,
-            "openleiden": self.open_leiden_module,
-            "ses": self.start_energy_storage,
-            "f": self.start_main_fusion,
-            "clock": self.lock_values,
-            "unclock": self.unlock_values,
-            "ly": self.show_light_years,
-            "ccu": self.cooling_curvature,
-            "ac": self.start_alcubierre_component,
-            "hc": self.start_harold_component,
-            "sr": self.start_richard_ring,
-            "SR": self.stop_richard_ring,
-            "pi": self.energy_pour_into,
-            "tr": self.set_torque_ratio,
-            "m+": self.start_negative_field,
-            "m-": self.start_positive_field,
-            "Heim": self.start_heim_bubble,
-            "drive": self.start_curvature_drive,
-            "sas": self.stop_all_systems,
-            "year": self.detect_year,
-            "status": self.show_detailed_status,
-            "log": self.show_flight_log,
-            "help": self.show_help,
-            "exit": self.exit_game,
-            "quit": self.exit_game,
-            "ca": self.change_curvature,
-            "pre": self.detach_port,
-            "foli": self.configure_foli
-        }
+        self.TELEMETRY_DIR = os.path.join(self.GAME_DIR, "telemetry")
+        self.TELEMETRY = None
+        self.SHARED_STATE = None
+        self.STREAM = None
+        self.METRICS = None
+        self.METRICS_FILE = os.path.join(self.GAME_DIR, "metrics.prom")
+        self.PAUSED_TIME = 0.0  # 剧情等待与用户输入累计时间
+        self.PROFILER = None
+        self.PROFILE_MODE = None
+        self.PROFILE_ACTIVE = False
+        self.PROFILE_DIR = os.path.join(self.GAME_DIR, "profiles")
+        self.MACRO_DIR = os.path.join(self.GAME_DIR, "macros")
+        self.MACROS = {}  # 宏名称 -> (文件修改时间, 已校验的命令序列)
+        
+        self.GAME_DIR_READY = False  # 游戏目录在首次写文件时创建
+        self.STARTUP_MS = None
+        
+        # 事件总线
+        self.BUS = EventBus()
+        self.BUS.subscribe(LogEntry, self.write_log_entries, batched=True)
+        self.BUS.subscribe(AchievementEarned, self.on_achievement)
+        self.BUS.subscribe(Malfunction, self.on_malfunction)
+        self.BUS.subscribe(RegionCrossed, self.on_region_crossed)
+        self.BUS.subscribe(CommandExecuted, self.check_rules)
+        self.BUS.subscribe(FrameUpdated, self.check_rules)
+        RULES.seed(self)
+
+    @cached_property
+    def COMMANDS(self) -> Dict[str, Any]:
+        """命令映射，首次分发命令时才构建"""
+        return {name: getattr(self, method) for name, method in COMMAND_HANDLERS.items()}
 
     def safe_division(self, a, b):
         """安全除法，避免除零错误"""
@@ -127,21 +1173,221 @@ class FusionGame:
         return a / b
 
     def log_event(self, event: str):
-        """记录事件到日志文件"""
+        """记录事件到日志文件 (经事件总线，交互模式下异步批量写入)"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.BUS.publish(LogEntry(timestamp, event))
+
+    def ensure_game_dir(self):
+        if not self.GAME_DIR_READY:
+            os.makedirs(self.GAME_DIR, exist_ok=True)
+            self.GAME_DIR_READY = True
+
+    def write_log_entries(self, entries: List[LogEntry]):
+        self.ensure_game_dir()
         with open(self.LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] {event}\n")
+            f.write("".join(f"[{entry.timestamp}] {entry.message}\n" for entry in entries))
+
+    def emit_speed_changed(self):
+        self.BUS.publish(SpeedChanged(self.SPEED, self.SPEED_C))
+
+    def on_achievement(self, event: AchievementEarned):
+        self.echo(f"\033[1;33m🎉 获得成就: {event.name}\033[0m")
+        self.log_event(f"获得成就: {event.name}")
+
+    def on_malfunction(self, event: Malfunction):
+        if event.random:
+            self.echo("\033[1;31m⚠️ 警告: 检测到随机部件故障！\033[0m")
+            self.log_event("随机事件: 部件故障")
+
+    def on_region_crossed(self, event: RegionCrossed):
+        self.log_event(f"进入区域: {event.position}")
+
+    def component_mask(self) -> int:
+        """组件状态位掩码"""
+        mask = 0
+        for bit, name in enumerate(COMPONENT_FLAGS):
+            if getattr(self, name):
+                mask |= 1 << bit
+        return mask
+
+    def apply_component_mask(self, mask: int):
+        for bit, name in enumerate(COMPONENT_FLAGS):
+            setattr(self, name, bool(mask & (1 << bit)))
+
+    @property
+    def ACHIEVEMENTS(self) -> List[str]:
+        """已获得的成就名称"""
+        return [name for name, bit in ACHIEVEMENT_BITS.items() if self.ACHIEVEMENT_MASK & bit]
+
+    def capture_state(self) -> Dict[str, Any]:
+        """获取飞船状态快照"""
+        return {name: getattr(self, name) for name in SHIP_STATE_FIELDS}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """恢复飞船状态快照"""
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def start_telemetry(self):
+        """开始录制飞行遥测"""
+        filename = datetime.now().strftime('flight_%Y%m%d_%H%M%S.ftl')
+        self.TELEMETRY = TelemetryRecorder(os.path.join(self.TELEMETRY_DIR, filename))
+        self.BUS.subscribe(FrameUpdated, self.record_telemetry)
+        self.log_event(f"开始录制遥测: {filename}")
+
+    def telemetry_values(self) -> tuple:
+        """按 TELEMETRY_FIELDS 组装一帧遥测记录"""
+        values = []
+        for name, fmt in TELEMETRY_FIELDS:
+            if name == "TIMESTAMP":
+                values.append(time.time())
+            elif name == "COMPONENTS":
+                values.append(self.component_mask())
+            elif fmt.endswith("s"):
+                values.append(str(getattr(self, name)).encode('utf-8')[:int(fmt[:-1])])
+            elif name.endswith("_TIME"):
+                values.append(getattr(self, name).timestamp())
+            elif fmt in TELEMETRY_INT_RANGE:
+                values.append(saturate(getattr(self, name), fmt))
+            else:
+                values.append(float(getattr(self, name)))
+        return tuple(values)
+
+    def record_telemetry(self, event: Optional[FrameUpdated] = None):
+        """记录一帧遥测；录制失败时停止录制，不影响本帧其余更新"""
+        if self.TELEMETRY is None:
+            return
+        try:
+            self.TELEMETRY.record(self.telemetry_values())
+        except (struct.error, OverflowError, ValueError, OSError) as e:
+            recorder, self.TELEMETRY = self.TELEMETRY, None
+            try:
+                recorder.close()
+            except OSError:
+                pass
+            self.log_event(f"遥测录制失败，已停止录制: {e}")
+
+    def start_state_export(self, name: str = SHARED_STATE_NAME):
+        """开始向共享内存发布飞船状态"""
+        self.SHARED_STATE = SharedStateWriter(name)
+        self.BUS.subscribe(FrameUpdated, self.export_state)
+        self.log_event(f"开始共享内存状态发布: {name}")
+
+    def export_state(self, event: Optional[FrameUpdated] = None):
+        """发布一帧共享内存状态"""
+        if self.SHARED_STATE is None:
+            return
+        self.SHARED_STATE.publish((
+            time.time(),
+            float(self.SPEED),
+            float(self.SPEED_C),
+            float(self.DISTANCE_KM),
+            float(self.THRUSTER_POWER),
+            float(self.SPECIFIC_IMPULSE),
+            float(self.FUSION_ENERGY),
+            float(self.ENERGY_CONSUMED),
+            float(self.TOTAL_ENERGY_CONSUMED),
+            self.component_mask(),
+            self.ACHIEVEMENT_MASK,
+            state_code(SHIP_STATES, self.SHIP_STATE),
+            state_code(FUSION_STATES, self.FUSION_STATE),
+            state_code(MALFUNCTIONS, self.MALFUNCTION),
+            state_code(POSITIONS, self.POSITION),
+        ))
+
+    def start_state_stream(self, port: int = STREAM_PORT):
+        """启动本地状态推送服务"""
+        self.STREAM = StateStreamServer(port=port)
+        self.BUS.subscribe(FrameUpdated, lambda event: self.STREAM.publish(self.stream_state()))
+        for event_type in (ComponentStarted, SpeedChanged, RegionCrossed, Malfunction, AchievementEarned):
+            self.BUS.subscribe(event_type, self.STREAM.publish_event)
+        self.log_event(f"启动状态推送服务: http://127.0.0.1:{self.STREAM.port}/stream")
+
+    def stream_state(self) -> Dict[str, Any]:
+        """推送给观察者的状态字段"""
+        return {
+            "speed": self.SPEED,
+            "speed_c": self.SPEED_C,
+            "speed_unit": self.SPEED_UNIT,
+            "power": self.THRUSTER_POWER,
+            "impulse": self.SPECIFIC_IMPULSE,
+            "position": self.POSITION,
+            "latitude": self.LATITUDE,
+            "ship_time": self.SHIP_TIME.strftime('%Y-%m-%d %H:%M:%S'),
+            "distance_km": self.DISTANCE_KM,
+            "ship_state": self.SHIP_STATE,
+            "malfunction": self.MALFUNCTION,
+            "fusion_state": self.FUSION_STATE,
+            "preprocess": self.PREPROCESS_EVENT,
+            "torque": self.TORQUE_RATIO,
+            "const_phase": self.CONST_PHASE,
+            "fusion_energy": self.FUSION_ENERGY,
+            "energy_consumed": self.ENERGY_CONSUMED,
+            "total_energy": self.TOTAL_ENERGY_CONSUMED,
+            "neg_field": self.NEG_FIELD_PERCENT,
+            "pos_field": self.POS_FIELD_PERCENT,
+            "bubble": self.BUBBLE_PERCENT,
+            "components": self.component_mask(),
+            "achievements": self.ACHIEVEMENT_MASK,
+        }
+
+    def publish_frame(self):
+        """发布一帧状态更新，规则、遥测、共享内存与推送服务均订阅此事件"""
+        self.BUS.publish(FRAME_UPDATED)
+
+    def apply_telemetry_frame(self, values: tuple):
+        """将一帧遥测还原到飞船状态 (用于回放显示)"""
+        for (name, fmt), value in zip(TELEMETRY_FIELDS, values):
+            if name == "TIMESTAMP":
+                continue
+            elif name == "COMPONENTS":
+                self.apply_component_mask(value)
+            elif fmt.endswith("s"):
+                setattr(self, name, value.rstrip(b"\0").decode('utf-8', 'ignore'))
+            elif name.endswith("_TIME"):
+                setattr(self, name, datetime.fromtimestamp(value))
+            else:
+                setattr(self, name, value)
+        self.DISTANCE_AU = self.DISTANCE_KM / self.AU_TO_KM
+        self.LIGHT_YEARS_TRAVELED = self.DISTANCE_KM / self.LY_TO_KM
+
+    def sleep(self, seconds: float):
+        """剧情等待，计入暂停时间 (无界面模式不真正等待，也不计入)"""
+        self.OUTPUT.flush()
+        if not self.HEADLESS:
+            self.PAUSED_TIME += seconds
+            time.sleep(seconds)
+
+    def prompt(self, text: str = "") -> str:
+        """命令执行中等待用户输入，计入暂停时间"""
+        if self.HEADLESS:
+            return self.SCRIPTED_INPUT.pop(0) if self.SCRIPTED_INPUT else self.HEADLESS_ANSWER
+        self.OUTPUT.flush()
+        start = time.perf_counter()
+        try:
+            return input(text)
+        finally:
+            self.PAUSED_TIME += time.perf_counter() - start
+
+    def echo(self, *values, sep: str = " ", end: str = "\n", flush: bool = False):
+        """写入输出层 (与 print 参数一致)"""
+        self.OUTPUT.write(sep.join(map(str, values)) + end)
+        if flush:
+            self.OUTPUT.flush()
 
     def typewriter_effect(self, text: str, delay: float = 0.05):
         """打字机效果显示文本"""
+        if not self.OUTPUT.typewriter:
+            self.echo(text)
+            return
         for char in text:
-            print(char, end='', flush=True)
-            time.sleep(delay)
-        print()
+            self.OUTPUT.write(char)
+            self.sleep(delay)
+        self.echo()
 
     def clear_screen(self):
         """清屏"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.OUTPUT.clear()
 
     def show_art(self):
         """显示艺术字"""
@@ -153,9 +1399,9 @@ class FusionGame:
 ██║     ╚██████╔╝███████║██║██║  ██║██████╔╝██║ ╚████║
 ╚═╝      ╚═════╝ ╚══════╝╚═╝╚═╝  ╚═╝╚═════╝ ╚═╝  ╚═══╝
         """
-        print("\033[1;36m")  # 青色
-        print(art)
-        print("\033[0m")
+        self.echo("\033[1;36m")  # 青色
+        self.echo(art)
+        self.echo("\033[0m")
 
     def show_about(self):
         """显示关于信息"""
@@ -170,89 +1416,89 @@ class FusionGame:
 \033[1;33m阿尔库g-05型光速末日飞船模拟器\033[0m
 基于广义相对论与曲率驱动理论的科幻模拟
         """
-        print(about_info)
+        self.echo(about_info)
 
     def admin_login(self):
         """管理员登录剧情"""
         self.clear_screen()
         self.show_art()
         
-        print("\033[1;32m", end='')
+        self.echo("\033[1;32m", end='')
         self.typewriter_effect("欢迎您使用'阿尔库g-05型'光速末日飞船", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("您一定还记得，当时签下的《反末日法西斯安全合同》", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("您现在乘坐的，是人类第五型最安全的空间曲率驱动飞船", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
-        print("\033[1;31m", end='')
+        self.echo("\033[1;31m", end='')
         self.typewriter_effect("请让我再次复述，您的任务是——走到宇宙尽头", 0.04)
-        print("\033[1;32m", end='')
-        time.sleep(1)
+        self.echo("\033[1;32m", end='')
+        self.sleep(1)
         
         self.typewriter_effect("根据第一型所证实的'爱因斯坦相对论'", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("根据您的参照系，当运行时间够久，您大概率会代替全人类看到宇宙末日", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("您是安全的", 0.05)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("请为人类社会实现您最后的价值", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("正如合同所说，您的家庭会被社会滋养，被万人罩棚", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("您可以开始了", 0.05)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("当前状态:位于'末日'型贰号发射井，冷却液已填充完成", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("您将会看到飞船终端", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("如果遗忘了之前培训的启动方式和过程", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("所导致人类社会被毁灭", 0.04)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("合同内容作废", 0.05)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("同时，为遵循人性化", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
         self.typewriter_effect("我们在终端的私有文件夹中存放有txt格式的启动教程", 0.03)
-        time.sleep(1)
+        self.sleep(1)
         
-        print("\033[1;32m", end='')
+        self.echo("\033[1;32m", end='')
         self.typewriter_effect("请输入 'pre' 开始脱离发射港程序", 0.03)
-        print("\033[0m")
-        time.sleep(2)
+        self.echo("\033[0m")
+        self.sleep(2)
 
     def add_achievement(self, achievement: str):
         """添加成就"""
-        if achievement not in self.ACHIEVEMENTS:
-            self.ACHIEVEMENTS.append(achievement)
-            print(f"\033[1;33m🎉 获得成就: {achievement}\033[0m")
-            self.log_event(f"获得成就: {achievement}")
+        bit = ACHIEVEMENT_BITS[achievement]
+        if not self.ACHIEVEMENT_MASK & bit:
+            self.ACHIEVEMENT_MASK |= bit
+            self.BUS.publish(AchievementEarned(achievement))
 
     def check_random_event(self):
         """检查随机事件"""
-        if random.random() < self.RANDOM_EVENT_CHANCE:
+        if self.EVENTS.trial("推进零件故障"):
             self.MALFUNCTION = "推进零件故障(概率事件)"
-            print("\033[1;31m⚠️ 警告: 检测到随机部件故障！\033[0m")
-            self.log_event("随机事件: 部件故障")
+            self.BUS.publish(Malfunction(self.MALFUNCTION, True))
             
             if self.FUSION_ENGINE_ON:
                 self.THRUSTER_POWER = max(0, self.THRUSTER_POWER - 5)
                 self.SPEED = max(0, self.SPEED - 50)
+                self.emit_speed_changed()
             return True
         return False
 
@@ -316,10 +1562,12 @@ class FusionGame:
 
     def show_panel(self):
         """显示数值面板"""
+        if not self.OUTPUT.enabled:
+            return
         self.clear_screen()
-        print("=" * 80)
-        print("                阿尔库g-05型光速末日飞船 - 控制系统")
-        print("=" * 80)
+        self.echo("=" * 80)
+        self.echo("                阿尔库g-05型光速末日飞船 - 控制系统")
+        self.echo("=" * 80)
         
         # 速度显示
         speed_display = f"{self.SPEED_C:.3f}" if self.SPEED_UNIT == "c" else f"{self.SPEED}"
@@ -340,26 +1588,26 @@ class FusionGame:
         distance_color = "\033[32m" if self.DISTANCE_KM >= self.SOLAR_SYSTEM_RADIUS_KM else "\033[31m"
         distance_display = f"{distance_color}{self.format_distance(self.DISTANCE_KM)} km\033[0m"
         
-        print(f"速度({self.SPEED_UNIT}): {speed_display:<15} 推进器功率: {power_display:<10} 比冲: {impulse_display:<10}")
-        print(f"位置: {self.POSITION:<20} 时间: {self.SHIP_TIME.strftime('%Y-%m-%d %H:%M:%S'):<30}")
-        print(f"航行距离: {distance_display:<20} AU: {self.DISTANCE_AU:.6f}")
+        self.echo(f"速度({self.SPEED_UNIT}): {speed_display:<15} 推进器功率: {power_display:<10} 比冲: {impulse_display:<10}")
+        self.echo(f"位置: {self.POSITION:<20} 时间: {self.SHIP_TIME.strftime('%Y-%m-%d %H:%M:%S'):<30}")
+        self.echo(f"航行距离: {distance_display:<20} AU: {self.DISTANCE_AU:.6f}")
         
         # 故障显示
         malfunction_display = self.MALFUNCTION
         if self.MALFUNCTION != "无":
             malfunction_display = f"\033[31m{self.MALFUNCTION}\033[0m"
         
-        print(f"当前状态: {self.SHIP_STATE:<15} 故障: {malfunction_display:<20}")
-        print(f"聚变发动机状态: {self.FUSION_STATE:<10} 预处理事件: {self.PREPROCESS_EVENT:<15}")
-        print(f"当前速度(c): {self.SPEED_C:<10.3f} 扭矩比: {self.TORQUE_RATIO:<10} 恒定阶段: {self.CONST_PHASE:<10}")
+        self.echo(f"当前状态: {self.SHIP_STATE:<15} 故障: {malfunction_display:<20}")
+        self.echo(f"聚变发动机状态: {self.FUSION_STATE:<10} 预处理事件: {self.PREPROCESS_EVENT:<15}")
+        self.echo(f"当前速度(c): {self.SPEED_C:<10.3f} 扭矩比: {self.TORQUE_RATIO:<10} 恒定阶段: {self.CONST_PHASE:<10}")
         
         # 能量显示（科学计数法防止溢出）
         fusion_energy_str = f"{self.FUSION_ENERGY:.2e}" if self.FUSION_ENERGY > 1e12 else f"{self.FUSION_ENERGY}"
         energy_consumed_str = f"{self.ENERGY_CONSUMED:.2e}" if self.ENERGY_CONSUMED > 1e12 else f"{self.ENERGY_CONSUMED}"
         total_energy_str = f"{self.TOTAL_ENERGY_CONSUMED:.2e}" if self.TOTAL_ENERGY_CONSUMED > 1e12 else f"{self.TOTAL_ENERGY_CONSUMED}"
         
-        print(f"聚变发动机产生能量: {fusion_energy_str:<15}J 当前操作预消耗能量: {energy_consumed_str:<15}J")
-        print(f"已消耗的能量: {total_energy_str:<15}J 纬度: {self.LATITUDE:<20}")
+        self.echo(f"聚变发动机产生能量: {fusion_energy_str:<15}J 当前操作预消耗能量: {energy_consumed_str:<15}J")
+        self.echo(f"已消耗的能量: {total_energy_str:<15}J 纬度: {self.LATITUDE:<20}")
         
         # 场生成显示
         neg_field_display = self.NEG_FIELD_PERCENT
@@ -380,19 +1628,19 @@ class FusionGame:
         else:
             bubble_display = f"{self.BUBBLE_PERCENT}%"
         
-        print(f"负能场: {neg_field_display:<15} 正能场: {pos_field_display:<15} 曲率泡: {bubble_display:<15}")
+        self.echo(f"负能场: {neg_field_display:<15} 正能场: {pos_field_display:<15} 曲率泡: {bubble_display:<15}")
         
         # 聚变参数显示
         if self.TEMPERATURE > 0:
-            print(f"聚变温度: {self.TEMPERATURE}℃ 压力比: {self.PRESSURE_RATIO}")
+            self.echo(f"聚变温度: {self.TEMPERATURE}℃ 压力比: {self.PRESSURE_RATIO}")
         
         # 成就显示
         if self.ACHIEVEMENTS:
-            print("-" * 80)
-            print(f"成就: {' '.join(self.ACHIEVEMENTS)}")
+            self.echo("-" * 80)
+            self.echo(f"成就: {' '.join(self.ACHIEVEMENTS)}")
         
-        print("=" * 80)
-        print()
+        self.echo("=" * 80)
+        self.echo()
 
     def parse_command(self, input_str: str):
         """解析命令"""
@@ -406,24 +1654,170 @@ class FusionGame:
         
         return cmd, args, remaining
 
+    def parse_pipeline(self, input_str: str) -> List[Tuple[str, List[str]]]:
+        """解析以 ';' 分隔的命令管道并展开 '@宏'
+
+        多条命令或含宏时，整条管道在执行前统一校验，任何一步不合法都抛出 ValueError，
+        不会执行到一半才失败。单条命令保持原有行为，由命令自身报告参数错误。
+        宏在读取时已校验，这里只校验直接输入的命令。
+        """
+        if self.parse_command(input_str)[0] == "macro":
+            segments = [input_str]
+        else:
+            segments = input_str.split(";")
+        
+        parsed = [self.parse_command(segment)[:2] for segment in segments]
+        parsed = [(cmd, args) for cmd, args in parsed if cmd]
+        if len(parsed) > 1 or any(cmd.startswith("@") for cmd, _ in parsed):
+            for index, (cmd, args) in enumerate(parsed, 1):
+                error = None if cmd.startswith("@") else self.validate_command(cmd, args)
+                if error:
+                    raise ValueError(f"第 {index} 条命令 {error}")
+        
+        steps = []
+        for cmd, args in parsed:
+            if cmd.startswith("@"):
+                steps.extend(self.load_macro(cmd[1:]))
+            else:
+                steps.append((cmd, args))
+        return steps
+
+    def validate_command(self, cmd: str, args: List[str]) -> Optional[str]:
+        """按命令表和参数形式校验命令，返回错误信息"""
+        if cmd not in self.COMMANDS:
+            return f"未知命令: {cmd}"
+        shapes = COMMAND_ARGS.get(cmd)
+        if shapes is not None and not any(match_args(shape, args) for shape in shapes):
+            return f"参数错误: {' '.join([cmd] + args)}"
+        return None
+
+    def validate_pipeline(self, steps: List[Tuple[str, List[str]]]):
+        for index, (cmd, args) in enumerate(steps, 1):
+            error = self.validate_command(cmd, args)
+            if error:
+                raise ValueError(f"第 {index} 条命令 {error}")
+
+    def load_macro(self, name: str) -> List[Tuple[str, List[str]]]:
+        """读取并校验宏，文件未修改时直接复用上次的校验结果"""
+        if not valid_macro_name(name):
+            raise ValueError(f"宏名称不合法: {name}")
+        path = os.path.join(self.MACRO_DIR, name + MACRO_EXT)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise ValueError(f"宏不存在: {name}")
+        cached = self.MACROS.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.split("#", 1)[0] for line in f]
+        steps = []
+        for segment in ";".join(lines).split(";"):
+            cmd, args, _ = self.parse_command(segment)
+            if not cmd:
+                continue
+            if cmd.startswith("@") or cmd == "macro":
+                raise ValueError(f"宏 {name} 中不能调用其他宏")
+            steps.append((cmd, args))
+        try:
+            self.validate_pipeline(steps)
+        except ValueError as e:
+            raise ValueError(f"宏 {name} {e}")
+        self.MACROS[name] = (mtime, steps)
+        return steps
+
+    def run_pipeline(self, steps: List[Tuple[str, List[str]]]) -> List[str]:
+        """连续执行已校验的命令，中间不刷新面板"""
+        return [self.process_command(cmd, args) for cmd, args in steps]
+
+    def macro_command(self, args):
+        """管理命令宏"""
+        action = args[0] if args else "list"
+        if action == "list":
+            try:
+                names = sorted(f[:-len(MACRO_EXT)] for f in os.listdir(self.MACRO_DIR) if f.endswith(MACRO_EXT))
+            except FileNotFoundError:
+                names = []
+            if not names:
+                return "暂无宏，使用 'macro save <名称> <命令; 命令...>' 创建"
+            return "可用宏: " + " ".join("@" + name for name in names)
+        
+        if len(args) < 2:
+            return "错误: 用法 macro list|show|save|del <名称>"
+        name = args[1]
+        if not valid_macro_name(name):
+            return f"错误: 宏名称不合法: {name}"
+        path = os.path.join(self.MACRO_DIR, name + MACRO_EXT)
+        
+        if action == "show":
+            try:
+                steps = self.load_macro(name)
+            except ValueError as e:
+                return f"❌ {e}"
+            return "\n".join(" ".join([cmd] + step_args) for cmd, step_args in steps)
+        if action == "save":
+            steps = [self.parse_command(segment)[:2] for segment in " ".join(args[2:]).split(";")]
+            steps = [step for step in steps if step[0]]
+            if not steps:
+                return "错误: 宏内容为空"
+            if any(cmd.startswith("@") or cmd == "macro" for cmd, _ in steps):
+                return "❌ 宏中不能调用其他宏"
+            try:
+                self.validate_pipeline(steps)
+            except ValueError as e:
+                return f"❌ {e}"
+            os.makedirs(self.MACRO_DIR, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("".join(" ".join([cmd] + step_args) + "\n" for cmd, step_args in steps))
+            self.log_event(f"保存宏: {name} ({len(steps)} 条命令)")
+            return f"✅ 宏已保存，输入 '@{name}' 执行"
+        if action == "del":
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return f"❌ 宏不存在: {name}"
+            self.MACROS.pop(name, None)
+            self.log_event(f"删除宏: {name}")
+            return f"✅ 已删除宏: {name}"
+        return f"错误: 未知操作 {action}"
+
     def process_command(self, cmd: str, args: List[str]):
         """处理命令"""
         self.COMMAND_COUNT += 1
         
-        # 成就检查
-        if self.COMMAND_COUNT == 1:
-            self.add_achievement("山姆大叔需要你！")
-        elif self.COMMAND_COUNT == 10:
-            self.add_achievement("fu*k！")
-        
         # 检查是否在发射港中
-        if self.IN_PORT and not self.PORT_DETACHED and cmd not in ["pre", "help", "exit", "quit"]:
-            return "❌ 错误: 请先脱离发射港 (输入 'pre')"
-        
-        if cmd in self.COMMANDS:
-            return self.COMMANDS[cmd](args)
+        if self.IN_PORT and not self.PORT_DETACHED and cmd not in ["pre", "help", "exit", "quit", "perf", "profile", "macro"]:
+            result = "❌ 错误: 请先脱离发射港 (输入 'pre')"
+        elif cmd in self.COMMANDS:
+            if self.METRICS is None:
+                result = self.COMMANDS[cmd](args)
+            else:
+                result = self.METRICS.measure(cmd, self.COMMANDS[cmd], args)
         else:
-            return f"未知命令: {cmd}\n输入 'help' 查看可用命令"
+            result = f"未知命令: {cmd}\n输入 'help' 查看可用命令"
+        
+        # 通知订阅者 (成就与事件规则等)
+        self.BUS.publish(CommandExecuted(cmd, tuple(args)))
+        return result
+
+    def check_rules(self, event=None):
+        """评估输入字段发生变化的规则"""
+        RULES.evaluate(self)
+
+    def tick(self):
+        """推进一帧: 更新时间与位置并发布状态，与交互模式每次出现提示符前相同"""
+        self.update_time()
+        self.update_position()
+        self.publish_frame()
+
+    def run_script(self, lines: List[str]) -> List[str]:
+        """依次执行脚本中的命令，返回各命令结果 (每行之前推进一帧，如同逐行输入)"""
+        results = []
+        for line in lines:
+            self.tick()
+            results.extend(self.run_pipeline(self.parse_pipeline(line)))
+        return results
 
     # 新增命令实现
     def change_curvature(self, args):
@@ -438,6 +1832,7 @@ class FusionGame:
             
             self.SPEED_C = new_speed_c
             self.log_event(f"改变曲率驱动光速: {new_speed_c}c")
+            self.emit_speed_changed()
             return f"✅ 曲率驱动光速已设置为: {new_speed_c}c"
         except ValueError:
             return "错误: 参数必须为数字"
@@ -449,13 +1844,13 @@ class FusionGame:
         
         if len(args) == 0:
             # 第一阶段脱离
-            print("\033[33m正在启动聚变发动机指定脱港GF-71协议中。\033[0m")
-            time.sleep(1)
-            print("\033[32m正在脱离卸钩，发射港脱离中……\033[0m")
-            time.sleep(3)
-            print("发射港状态:【已脱离】")
-            time.sleep(10)
-            print("您现在已脱离钱学森伍形发射港，人类社会将对您舍生的精神抱以诚挚的感谢和敬意！")
+            self.echo("\033[33m正在启动聚变发动机指定脱港GF-71协议中。\033[0m")
+            self.sleep(1)
+            self.echo("\033[32m正在脱离卸钩，发射港脱离中……\033[0m")
+            self.sleep(3)
+            self.echo("发射港状态:【已脱离】")
+            self.sleep(10)
+            self.echo("您现在已脱离钱学森伍形发射港，人类社会将对您舍生的精神抱以诚挚的感谢和敬意！")
             self.PORT_DETACHED = True
             self.IN_PORT = False
             self.log_event("脱离发射港完成")
@@ -463,11 +1858,11 @@ class FusionGame:
         
         elif len(args) == 2:
             # 第二阶段发动机授权
-            print("\033[32m已授权发动机指令。\033[0m")
-            time.sleep(1)
-            print("正在脱冷预热中……")
-            time.sleep(3)
-            print("当前发动机为:【氢氦聚变发动机】，已设置好功率和比冲，请输入 'foli [温度(℃)] [压力比]'，以启动聚变发动机。")
+            self.echo("\033[32m已授权发动机指令。\033[0m")
+            self.sleep(1)
+            self.echo("正在脱冷预热中……")
+            self.sleep(3)
+            self.echo("当前发动机为:【氢氦聚变发动机】，已设置好功率和比冲，请输入 'foli [温度(℃)] [压力比]'，以启动聚变发动机。")
             self.THRUSTER_POWER = int(args[0])
             self.SPECIFIC_IMPULSE = int(args[1])
             return ""
@@ -494,7 +1889,7 @@ class FusionGame:
             self.FOLI_CONFIGURED = True
             self.log_event(f"配置聚变发动机 - 温度: {temperature}℃, 压力比: {pressure_ratio}")
             
-            print("已设置完成，输入 'drive a'，来启动发动机。")
+            self.echo("已设置完成，输入 'drive a'，来启动发动机。")
             return ""
         except ValueError:
             return "错误: 温度必须为整数"
@@ -504,16 +1899,18 @@ class FusionGame:
         if not self.FOLI_CONFIGURED:
             return "❌ 错误: 请先配置聚变发动机 (foli命令)"
         
-        print("\033[33m(2秒)聚变发动机已启动\033[0m")
-        time.sleep(2)
-        print("(3秒)您已踏上宇宙的旅途，请记住，地球，永远是你的家。")
-        time.sleep(3)
-        print("(4秒)当前已航行出黄色违禁区，请启动主聚变引擎30。")
+        self.echo("\033[33m(2秒)聚变发动机已启动\033[0m")
+        self.sleep(2)
+        self.echo("(3秒)您已踏上宇宙的旅途，请记住，地球，永远是你的家。")
+        self.sleep(3)
+        self.echo("(4秒)当前已航行出黄色违禁区，请启动主聚变引擎30。")
         
         self.FUSION_ENGINE_ON = True
         self.SHIP_STATE = "氢氦聚变推进"
         self.SPEED = 10000  # 初始速度
         self.log_event("启动氢氦聚变发动机")
+        self.BUS.publish(ComponentStarted("氢氦聚变发动机"))
+        self.emit_speed_changed()
         
         return ""
 
@@ -531,11 +1928,11 @@ class FusionGame:
         except ValueError:
             return "错误: 参数必须为整数"
         
-        if power < 1 or power > 100:
-            return "错误: 功率必须在 1-100 之间"
+        if not PFE_POWER_RANGE[0] <= power <= PFE_POWER_RANGE[1]:
+            return f"错误: 功率必须在 {PFE_POWER_RANGE[0]}-{PFE_POWER_RANGE[1]} 之间"
         
-        if impulse < 1000 or impulse > 50000:
-            return "错误: 比冲必须在 1000-50000 之间"
+        if not PFE_IMPULSE_RANGE[0] <= impulse <= PFE_IMPULSE_RANGE[1]:
+            return f"错误: 比冲必须在 {PFE_IMPULSE_RANGE[0]}-{PFE_IMPULSE_RANGE[1]} 之间"
         
         self.THRUSTER_POWER = power
         self.SPECIFIC_IMPULSE = impulse
@@ -547,10 +1944,10 @@ class FusionGame:
         self.TOTAL_ENERGY_CONSUMED += self.ENERGY_CONSUMED
         
         self.FUSION_COMMAND_COUNT += 1
-        if self.FUSION_COMMAND_COUNT == 1:
-            self.add_achievement("路易十六是交叉感染死的")
         
         self.log_event(f"启动聚变脉冲推进器 - 功率: {power}%, 比冲: {impulse}")
+        self.BUS.publish(ComponentStarted("聚变脉冲推进器"))
+        self.emit_speed_changed()
         result = f"✅ 聚变脉冲推进器启动 - 功率: {power}% 比冲: {impulse}"
         
         # 检查随机事件
@@ -571,12 +1968,13 @@ class FusionGame:
         if not self.ENERGY_STORAGE_ON:
             self.MALFUNCTION = "能量过载风险"
             self.log_event("错误尝试: 未启动能量栈堆即启动主聚变堆")
+            self.BUS.publish(Malfunction(self.MALFUNCTION, False))
             return "❌ 错误: 请先启动能量栈堆 (ses)"
         
-        if power > 150:
+        if power > MAIN_FUSION_MAX_POWER:
             self.MALFUNCTION = "发动机热锁死"
             self.log_event(f"发动机热锁死 - 功率过高: {power}%")
-            self.add_achievement("发动机！")
+            self.BUS.publish(Malfunction(self.MALFUNCTION, False))
             return "❌ 错误: 功率过高，发动机热锁死"
         
         self.MAIN_FUSION_ON = True
@@ -588,6 +1986,8 @@ class FusionGame:
         self.TOTAL_ENERGY_CONSUMED += self.ENERGY_CONSUMED
         
         self.log_event(f"启动主聚变堆 - 功率: {power}%")
+        self.BUS.publish(ComponentStarted("主聚变堆"))
+        self.emit_speed_changed()
         
         # 显示航行信息
         result = f"✅ 已启动主聚变发动机，当前功率: {power}%，速度为: {self.SPEED} km/h\n"
@@ -595,18 +1995,18 @@ class FusionGame:
         result += "   航行开始！\n"
         
         # 模拟航行过程
-        print(result)
+        self.echo(result)
         for i in range(5):
-            time.sleep(1)
+            self.sleep(1)
             self.update_position()
+            self.publish_frame()
             progress = min(100, (self.DISTANCE_KM / self.SOLAR_SYSTEM_RADIUS_KM) * 100)
             distance_color = "\033[32m" if self.DISTANCE_KM >= self.SOLAR_SYSTEM_RADIUS_KM else "\033[31m"
-            print(f"   ({i+1}秒)当前航行距离: {distance_color}{self.format_distance(self.DISTANCE_KM)} km\033[0m, "
+            self.echo(f"   ({i+1}秒)当前航行距离: {distance_color}{self.format_distance(self.DISTANCE_KM)} km\033[0m, "
                   f"AU: {self.DISTANCE_AU:.6f}, "
                   f"已完成: {progress:.2f}%")
         
         if self.DISTANCE_KM >= self.SOLAR_SYSTEM_RADIUS_KM:
-            self.add_achievement("太阳系穿越者")
             return "\n🎉 已成功穿越太阳系！可以开始曲率驱动准备。"
         else:
             return f"\n当前进度: {progress:.2f}%，请继续加速或等待。"
@@ -615,12 +2015,12 @@ class FusionGame:
         if not self.MAIN_FUSION_ON:
             return "❌ 错误: 请先启动主聚变堆"
         
-        print("\033[33m欢迎使用CPSNA研制的预冷却系统，您的聚变发动机正在冷却关停中……\033[0m")
-        time.sleep(1)
-        print("已达到SPA-02停机标准，授权CCA的曲率驱动预启动程序，感谢您的使用和信任！")
-        time.sleep(4)
+        self.echo("\033[33m欢迎使用CPSNA研制的预冷却系统，您的聚变发动机正在冷却关停中……\033[0m")
+        self.sleep(1)
+        self.echo("已达到SPA-02停机标准，授权CCA的曲率驱动预启动程序，感谢您的使用和信任！")
+        self.sleep(4)
         
-        agent_name = input("请输入您的名称或有象征性的代理名: ")
+        agent_name = self.prompt("请输入您的名称或有象征性的代理名: ")
         self.AGENT_NAME = agent_name
         
         # 创建感谢信
@@ -639,41 +2039,43 @@ CPSNA 全体成员
 {datetime.now().strftime('%Y年%m月%d日')}
         """
         
+        self.ensure_game_dir()
         with open(self.CPSNA_FILE, 'w', encoding='utf-8') as f:
             f.write(thank_you_note)
         
         self.SHIP_STATE = "预曲率驱动"
         self.PREPROCESS_EVENT = "冷却程序中"
         self.log_event("启动曲率驱动冷却系统")
-        self.add_achievement("我喜欢这来自暴风雨前的沉浸")
         return "✅ 曲率驱动冷却系统启动 - 准备超光速航行\n   感谢信已保存至 CPSNA.txt"
 
     def start_alcubierre_component(self, args):
-        print("\033[35mCiallo～(∠・ω< )⌒☆\033[0m")
-        time.sleep(1)
-        print("欢迎使用由一堆二次元研究的ac组件，您们是人类的希望！")
-        time.sleep(2)
-        print("正在启动修复LLO漏洞程序(检查权限，如:检测到您无权读取$[权限]，修复中)")
-        time.sleep(2)
-        print("正在启动小鸟葬六花v2.3程序……")
-        time.sleep(1)
-        
-        repair_percent = random.randint(25, 30)
-        print(f"此次修复漏洞区{repair_percent}％，残余未知漏洞:0％。地球永远是您的家！")
+        self.echo("\033[35mCiallo～(∠・ω< )⌒☆\033[0m")
+        self.sleep(1)
+        self.echo("欢迎使用由一堆二次元研究的ac组件，您们是人类的希望！")
+        self.sleep(2)
+        self.echo("正在启动修复LLO漏洞程序(检查权限，如:检测到您无权读取$[权限]，修复中)")
+        self.sleep(2)
+        self.echo("正在启动小鸟葬六花v2.3程序……")
+        self.sleep(1)
+        
+        repair_percent = self.RNG.randint(25, 30)
+        self.echo(f"此次修复漏洞区{repair_percent}％，残余未知漏洞:0％。地球永远是您的家！")
         
         self.ALCUBIERRE_COMP = True
         self.AC_ACTIVATED = True
         self.log_event("启动Alcubierre稳定性组件")
+        self.BUS.publish(ComponentStarted("Alcubierre稳定性组件"))
         
         # 检查是否自动启动Richard环
         if self.AC_ACTIVATED and self.HC_ACTIVATED and not self.RICHARD_RING:
-            response = input("正在自启动Richard奇异物质环自启动程序，是否允许程序自启动?(y/n): ")
+            response = self.prompt("正在自启动Richard奇异物质环自启动程序，是否允许程序自启动?(y/n): ")
             if response.lower() == 'y':
                 self.RICHARD_RING = True
                 self.log_event("Richard奇异物质环自启动")
-                time.sleep(1)
-                print("IAF和全体人类感谢您为人类做出的贡献，为您致敬。")
-                time.sleep(4)
+                self.BUS.publish(ComponentStarted("Richard奇异物质环"))
+                self.sleep(1)
+                self.echo("IAF和全体人类感谢您为人类做出的贡献，为您致敬。")
+                self.sleep(4)
                 return "✅ Richard奇异物质环已被打开，感谢您的付出！"
             else:
                 return "请自启动程序，IFA留。"
@@ -681,22 +2083,24 @@ CPSNA 全体成员
         return "✅ Alcubierre稳定性组件已启动"
 
     def start_harold_component(self, args):
-        print("正在启动Harold能量计算")
-        time.sleep(2)
-        print("启动成功。")
+        self.echo("正在启动Harold能量计算")
+        self.sleep(2)
+        self.echo("启动成功。")
         self.HAROLD_COMP = True
         self.HC_ACTIVATED = True
         self.log_event("启动Harold能量计算组件")
+        self.BUS.publish(ComponentStarted("Harold能量计算组件"))
         
         # 检查是否自动启动Richard环
         if self.AC_ACTIVATED and self.HC_ACTIVATED and not self.RICHARD_RING:
-            response = input("正在自启动Richard奇异物质环自启动程序，是否允许程序自启动?(y/n): ")
+            response = self.prompt("正在自启动Richard奇异物质环自启动程序，是否允许程序自启动?(y/n): ")
             if response.lower() == 'y':
                 self.RICHARD_RING = True
                 self.log_event("Richard奇异物质环自启动")
-                time.sleep(1)
-                print("IAF和全体人类感谢您为人类做出的贡献，为您致敬。")
-                time.sleep(4)
+                self.BUS.publish(ComponentStarted("Richard奇异物质环"))
+                self.sleep(1)
+                self.echo("IAF和全体人类感谢您为人类做出的贡献，为您致敬。")
+                self.sleep(4)
                 return "✅ Richard奇异物质环已被打开，感谢您的付出！"
             else:
                 return "请自启动程序，IFA留。"
@@ -712,33 +2116,34 @@ CPSNA 全体成员
         if self.POSITION in ["地球轨道", "地月系统", "太阳系内"]:
             self.MALFUNCTION = "违法启动曲率驱动"
             self.log_event(f"严重违规: 在 {self.POSITION} 区域尝试启动曲率驱动")
+            self.BUS.publish(Malfunction(self.MALFUNCTION, False))
             return "❌ 严重违规: 在禁止区域启动曲率驱动！"
         
         if not self.HEIM_BUBBLE_ON:
             return "❌ 错误: 曲率泡未就绪，请先启动Heim闭合器"
         
         # 安全检查
-        print("正在检查中...")
-        time.sleep(2)
+        self.echo("正在检查中...")
+        self.sleep(2)
         
         self.clear_screen()
-        print("当前扭矩比:", self.TORQUE_RATIO)
-        print("当前前方空间状态: 膨胀")
-        print("当前后方空间状态: 收缩")
-        print()
+        self.echo("当前扭矩比:", self.TORQUE_RATIO)
+        self.echo("当前前方空间状态: 膨胀")
+        self.echo("当前后方空间状态: 收缩")
+        self.echo()
         
         # 计算启动时间
-        launch_time = random.randint(30, 60)
-        print(f"您将于 {launch_time} 秒后进入光速，全体人类再次向您致敬，")
-        print("您的名字将会被命名成为任何恒星中的一颗恒星，您会被世人所铭记，")
-        print("希望您回来时，地球尚还存在，她任然是你的家！")
+        launch_time = self.RNG.randint(30, 60)
+        self.echo(f"您将于 {launch_time} 秒后进入光速，全体人类再次向您致敬，")
+        self.echo("您的名字将会被命名成为任何恒星中的一颗恒星，您会被世人所铭记，")
+        self.echo("希望您回来时，地球尚还存在，她任然是你的家！")
         
         # 模拟倒计时
         for i in range(launch_time, 0, -1):
-            print(f"\r进入光速倒计时: {i} 秒", end='', flush=True)
-            time.sleep(1)
+            self.echo(f"\r进入光速倒计时: {i} 秒", end='', flush=True)
+            self.sleep(1)
         
-        print("\n🚀 曲率驱动启动！")
+        self.echo("\n🚀 曲率驱动启动！")
         
         self.CURVATURE_DRIVE_ACTIVE = True
         self.DRIVE_BALANCER_ON = True
@@ -751,11 +2156,8 @@ CPSNA 全体成员
         self.TOTAL_ENERGY_CONSUMED += self.ENERGY_CONSUMED
         
         self.log_event("启动曲率场平衡器 - 进入超光速航行")
-        self.add_achievement("这是一个信封")
-        
-        if self.LIGHT_YEARS_TRAVELED > 100:
-            self.add_achievement("前进，不择手段的前进！")
-        
+        self.BUS.publish(ComponentStarted("曲率场平衡器"))
+        self.emit_speed_changed()
         return "✅ 曲率场平衡器启动 - 进入超光速航行！"
 
     def detect_year(self, args):
@@ -766,11 +2168,11 @@ CPSNA 全体成员
             time_dilation = self.safe_division(1, math.sqrt(1 - min(0.999999, self.SPEED_C ** 2)))
         
         result = f"正在计算当前地球元年……\n"
-        print(result)
-        time.sleep(9)
+        self.echo(result)
+        self.sleep(9)
         
         year_result = f"当前地球元年: {earth_year:.2f}"
-        print(year_result)
+        self.echo(year_result)
         
         if earth_year > 2025:
             self.show_ending()
@@ -793,10 +2195,10 @@ CPSNA 全体成员
         """
         
         for line in ending_text.split('\n'):
-            print(line)
-            time.sleep(1)
+            self.echo(line)
+            self.sleep(1)
         
-        input("\n按回车键退出...")
+        self.prompt("\n按回车键退出...")
         self.exit_game([])
 
     # 其他命令保持不变（但已修复除零错误）
@@ -810,27 +2212,94 @@ CPSNA 全体成员
         self.MAIN_FUSION_ON = False
         self.ENERGY_CONSUMED = 0
         self.log_event("关闭聚变脉冲推进器")
+        self.emit_speed_changed()
         return "✅ 聚变脉冲推进器已关闭"
 
     def open_leiden_module(self, args):
         self.LEIDEN_MODULE = True
         self.log_event("启动莱顿稳定性模块")
+        self.BUS.publish(ComponentStarted("莱顿稳定性模块"))
         return "✅ 莱顿模块已启动 - 等离子体稳定性增强"
 
     def start_energy_storage(self, args):
         self.ENERGY_STORAGE_ON = True
         self.log_event("启动能量栈堆系统")
+        self.BUS.publish(ComponentStarted("能量栈堆"))
         return "✅ 能量栈堆已启动 - 能量缓冲就绪"
 
+    def take_snapshot(self, name: str) -> Snapshot:
+        """保存当前飞船状态、规则进度与随机事件进度"""
+        snapshot = Snapshot(name, datetime.now(), self.capture_state(), dict(self.RULE_VALUES),
+                            self.RULES_FIRED, self.EVENTS.getstate())
+        self.SNAPSHOTS = [s for s in self.SNAPSHOTS if s.name != name][-(SNAPSHOT_LIMIT - 1):] + [snapshot]
+        return snapshot
+
+    def restore_snapshot(self, snapshot: Snapshot):
+        self.restore_state(snapshot.state)
+        self.RULE_VALUES = dict(snapshot.rule_values)
+        self.RULES_FIRED = snapshot.rules_fired
+        self.EVENTS.setstate(snapshot.events)
+
+    def find_snapshot(self, name: Optional[str]) -> Optional[int]:
+        """返回快照在栈中的下标，未指定名称时为栈顶"""
+        if not self.SNAPSHOTS:
+            return None
+        if name is None:
+            return len(self.SNAPSHOTS) - 1
+        for index, snapshot in enumerate(self.SNAPSHOTS):
+            if snapshot.name == name:
+                return index
+        return None
+
     def lock_values(self, args):
+        """锁定数值: 保存快照，之后可用 rollback 回到此刻"""
+        if args and args[0] == "list":
+            if not self.SNAPSHOTS:
+                return "暂无快照"
+            lines = [f"快照 ({len(self.SNAPSHOTS)}/{SNAPSHOT_LIMIT}):"]
+            for snapshot in reversed(self.SNAPSHOTS):
+                lines.append(f"  {snapshot.name:<12} {snapshot.taken.strftime('%H:%M:%S')}  "
+                             f"{snapshot.state['SHIP_STATE']}  {snapshot.state['POSITION']}")
+            return "\n".join(lines)
+        
+        name = args[0] if args else f"s{self.COMMAND_COUNT}"
+        dropped = len(self.SNAPSHOTS) >= SNAPSHOT_LIMIT and self.find_snapshot(name) is None
+        self.take_snapshot(name)
         self.CLOCK_LOCKED = True
-        self.log_event("锁定系统数值")
-        return "✅ 数值已锁定 - 系统参数固定"
+        self.log_event(f"锁定系统数值 - 快照: {name}")
+        result = f"✅ 数值已锁定 - 已保存快照 '{name}'，输入 'rollback' 可恢复"
+        if dropped:
+            result += f"\n   快照已满 ({SNAPSHOT_LIMIT})，最早的快照已丢弃"
+        return result
 
     def unlock_values(self, args):
-        self.CLOCK_LOCKED = False
-        self.log_event("解除数值锁定")
-        return "✅ 数值锁定已解除 - 可调整参数"
+        """解除锁定: 丢弃栈顶 (或指定) 快照，保留当前状态"""
+        index = self.find_snapshot(args[0] if args else None)
+        if index is None:
+            if args:
+                return f"❌ 快照不存在: {args[0]}"
+            self.CLOCK_LOCKED = False
+            return "✅ 数值锁定已解除 - 可调整参数"
+        snapshot = self.SNAPSHOTS.pop(index)
+        self.CLOCK_LOCKED = bool(self.SNAPSHOTS)
+        self.log_event(f"解除数值锁定 - 丢弃快照: {snapshot.name}")
+        return f"✅ 数值锁定已解除 - 已丢弃快照 '{snapshot.name}'"
+
+    def rollback(self, args):
+        """恢复到栈顶 (或指定) 快照，之后保存的快照一并丢弃"""
+        index = self.find_snapshot(args[0] if args else None)
+        if index is None:
+            if args:
+                return f"❌ 快照不存在: {args[0]}"
+            return "❌ 没有可恢复的快照，请先使用 'clock' 锁定数值"
+        snapshot = self.SNAPSHOTS[index]
+        del self.SNAPSHOTS[index + 1:]
+        self.restore_snapshot(snapshot)
+        # 快照本身保留，可以反复从同一状态重新尝试
+        self.CLOCK_LOCKED = True
+        self.log_event(f"回滚到快照: {snapshot.name}")
+        self.emit_speed_changed()
+        return f"✅ 已回滚到快照 '{snapshot.name}' ({snapshot.taken.strftime('%H:%M:%S')})"
 
     def show_light_years(self, args):
         return f"已行驶距离: {self.LIGHT_YEARS_TRAVELED:.6f} 光年\n相当于 {self.LIGHT_YEARS_TRAVELED * self.LY_TO_KM:.2f} 公里"
@@ -841,6 +2310,7 @@ CPSNA 全体成员
         
         self.RICHARD_RING = True
         self.log_event("启动Richard奇异物质环")
+        self.BUS.publish(ComponentStarted("Richard奇异物质环"))
         return "✅ Richard奇异物质环已启动 - 负能量场生成器预热"
 
     def stop_richard_ring(self, args):
@@ -869,7 +2339,7 @@ CPSNA 全体成员
         self.TOTAL_ENERGY_CONSUMED += self.ENERGY_CONSUMED
         self.log_event(f"能量灌注: {percent}%")
         
-        print("(3秒后)已灌注能量:", percent, "%")
+        self.echo("(3秒后)已灌注能量:", percent, "%")
         return ""
 
     def set_torque_ratio(self, args):
@@ -883,7 +2353,7 @@ CPSNA 全体成员
         self.TORQUE_RATIO = ratio
         self.log_event(f"设置扭矩比: {ratio}")
         
-        print("(3秒后)已设置扭矩比", ratio)
+        self.echo("(3秒后)已设置扭矩比", ratio)
         return ""
 
     def start_negative_field(self, args):
@@ -896,8 +2366,9 @@ CPSNA 全体成员
         self.NEGATIVE_FIELD_ON = True
         self.NEG_FIELD_PERCENT = 25
         self.log_event("启动负能量场 - 灌注率: 25%")
+        self.BUS.publish(ComponentStarted("负能量场"))
         
-        print("VVVV型负能场启动，填充值: 25")
+        self.echo("VVVV型负能场启动，填充值: 25")
         return ""
 
     def start_positive_field(self, args):
@@ -907,30 +2378,32 @@ CPSNA 全体成员
         self.POSITIVE_FIELD_ON = True
         self.POS_FIELD_PERCENT = 100
         self.log_event("启动正能量场 - 灌注率: 100%")
+        self.BUS.publish(ComponentStarted("正能量场"))
         
-        print("IIIII级可型正能场启动，填充值: 100")
+        self.echo("IIIII级可型正能场启动，填充值: 100")
         return ""
 
     def start_heim_bubble(self, args):
         if not self.NEGATIVE_FIELD_ON or not self.POSITIVE_FIELD_ON:
             return "❌ 错误: 请先启动正负能量场"
         
-        print("(1秒)正在闭合曲率泡中……")
-        time.sleep(4)
-        print("(5秒后)已隔绝舱内时空，已成功形成平坦时空舱")
+        self.echo("(1秒)正在闭合曲率泡中……")
+        self.sleep(4)
+        self.echo("(5秒后)已隔绝舱内时空，已成功形成平坦时空舱")
         
         self.HEIM_BUBBLE_ON = True
         self.BUBBLE_PERCENT = 100
         self.log_event("启动曲率泡闭合器")
+        self.BUS.publish(ComponentStarted("曲率泡闭合器"))
         return ""
 
     def stop_all_systems(self, args):
-        print("关闭一级系统...")
-        time.sleep(1)
-        print("关闭二级系统...")
-        time.sleep(1)
-        print("关闭三级系统...")
-        time.sleep(1)
+        self.echo("关闭一级系统...")
+        self.sleep(1)
+        self.echo("关闭二级系统...")
+        self.sleep(1)
+        self.echo("关闭三级系统...")
+        self.sleep(1)
         
         self.CURVATURE_DRIVE_ACTIVE = False
         self.DRIVE_BALANCER_ON = False
@@ -945,8 +2418,118 @@ CPSNA 全体成员
         self.POS_FIELD_PERCENT = "未启动"
         self.BUBBLE_PERCENT = "未启动"
         self.log_event("关闭所有曲率系统")
+        self.emit_speed_changed()
         return "✅ 所有曲率系统关闭，切换至常规推进"
 
+    def enable_metrics(self):
+        if self.METRICS is None:
+            self.METRICS = CommandMetrics(self)
+
+    def write_metrics(self):
+        """导出 Prometheus 格式的命令耗时"""
+        self.ensure_game_dir()
+        with open(self.METRICS_FILE, 'w', encoding='utf-8') as f:
+            f.write(self.METRICS.prometheus())
+
+    def show_perf(self, args):
+        action = args[0] if args else "show"
+        if action == "on":
+            self.enable_metrics()
+            self.log_event("启用命令耗时统计")
+            return "✅ 命令耗时统计已启用"
+        if action == "off":
+            self.METRICS = None
+            self.log_event("关闭命令耗时统计")
+            return "✅ 命令耗时统计已关闭"
+        if self.METRICS is None:
+            return "命令耗时统计未启用，输入 'perf on' 启用"
+        if action == "reset":
+            self.METRICS.reset()
+            return "✅ 命令耗时统计已清空"
+        if action == "dump":
+            self.write_metrics()
+            return f"✅ 已导出至 {self.METRICS_FILE}"
+        return "=== 命令耗时 (不含剧情等待) ===\n" + self.METRICS.report()
+
+    def start_profiler(self, mode: str = "cprofile"):
+        """开始性能分析: cprofile (确定性) 或 sample (采样)"""
+        if mode == "cprofile":
+            import cProfile
+            self.PROFILER = cProfile.Profile()
+            self.PROFILER.enable()
+        elif mode == "sample":
+            self.PROFILER = SamplingProfiler(threading.get_ident())
+            self.PROFILER.start()
+        else:
+            raise ValueError(f"未知分析模式: {mode}")
+        self.PROFILE_MODE = mode
+        self.PROFILE_ACTIVE = True
+        self.log_event(f"开始性能分析: {mode}")
+
+    def stop_profiler(self):
+        if self.PROFILE_MODE == "cprofile":
+            self.PROFILER.disable()
+        elif self.PROFILE_MODE == "sample":
+            self.PROFILER.stop()
+        self.PROFILE_ACTIVE = False
+        self.log_event("停止性能分析")
+
+    def dump_profile(self) -> str:
+        """写出分析结果，cprofile 为 .pstats，sample 为 .collapsed"""
+        os.makedirs(self.PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        if self.PROFILE_MODE == "cprofile":
+            path = os.path.join(self.PROFILE_DIR, f"session_{stamp}.pstats")
+            self.profile_stats().dump_stats(path)
+        else:
+            path = os.path.join(self.PROFILE_DIR, f"session_{stamp}.collapsed")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.PROFILER.collapsed())
+        self.log_event(f"导出性能分析: {path}")
+        return path
+
+    def profile_stats(self, stream=None):
+        """汇总 cProfile 结果；汇总会停用分析器，仍在分析中时重新启用"""
+        import pstats
+        stats = pstats.Stats(self.PROFILER, stream=stream)
+        if self.PROFILE_ACTIVE:
+            self.PROFILER.enable()
+        return stats
+
+    def profile_summary(self, limit: int = 15) -> str:
+        if self.PROFILE_MODE == "cprofile":
+            out = io.StringIO()
+            self.profile_stats(out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        top = sorted(self.PROFILER.stacks.items(), key=lambda item: -item[1])[:limit]
+        lines = [f"采样数: {self.PROFILER.samples}"]
+        lines.extend(f"{count:>6}  {stack.rsplit(';', 1)[-1]}" for stack, count in top)
+        return "\n".join(lines)
+
+    def profile_command(self, args):
+        action = args[0] if args else "status"
+        if action == "start":
+            if self.PROFILER is not None:
+                return "❌ 性能分析已在进行中"
+            mode = args[1] if len(args) > 1 else "cprofile"
+            try:
+                self.start_profiler(mode)
+            except ValueError as e:
+                return f"错误: {e} (可选 cprofile / sample)"
+            return f"✅ 性能分析已开始 ({mode})"
+        if self.PROFILER is None:
+            return "尚未开始性能分析，输入 'profile start [cprofile|sample]'"
+        if action == "stop":
+            self.stop_profiler()
+            summary = self.profile_summary()
+            path = self.dump_profile()
+            self.PROFILER = None
+            self.PROFILE_MODE = None
+            return f"✅ 性能分析已停止，结果已保存至 {path}\n{summary}"
+        if action == "dump":
+            return f"✅ 结果已保存至 {self.dump_profile()}"
+        return f"性能分析进行中 ({self.PROFILE_MODE})"
+
     def show_detailed_status(self, args):
         status = ["=== 详细系统状态 ==="]
         status.append(f"聚变引擎: {self.FUSION_STATE}")
@@ -963,6 +2546,7 @@ CPSNA 全体成员
         return "\n".join(status)
 
     def show_flight_log(self, args):
+        self.BUS.flush()
         try:
             with open(self.LOG_FILE, 'r', encoding='utf-8') as f:
                 logs = f.readlines()[-10:]
@@ -997,12 +2581,17 @@ drive a           - 启动聚变发动机
 sas               - 关闭所有曲率系统
 
 辅助系统:
-clock             - 锁定当前数值
-unclock           - 解除数值锁定
+clock [名称]      - 锁定当前数值并保存快照 (clock list 查看快照)
+unclock [名称]    - 解除数值锁定，丢弃快照
+rollback [名称]   - 恢复到快照
 ly                - 查询光年距离
 year              - 探测当前地球年
 status            - 详细系统状态
 log               - 查看飞行日志
+perf [on|off|reset|dump] - 命令耗时统计
+profile start|stop|dump [cprofile|sample] - 性能分析
+macro list|show|save|del [名称] - 管理命令宏
+@名称             - 执行命令宏
 help              - 显示命令帮助
 exit              - 退出系统
 
@@ -1012,52 +2601,175 @@ pre               - 脱离发射港
 pre [功率] [比冲] - 发动机授权
 foli [温度] [压力比] - 配置聚变发动机
 
-注意: 所有命令不用加<>，参数用空格分隔
+注意: 所有命令不用加<>，参数用空格分隔，多条命令可用 ; 连续执行
 示例: pfe 10 10000
+示例: ses; f 100; ccu
         """
         return help_text
 
     def exit_game(self, args):
         self.log_event("用户退出系统")
-        print("保存游戏并退出...")
+        self.BUS.close()
+        if self.TELEMETRY is not None:
+            self.TELEMETRY.close()
+        if self.SHARED_STATE is not None:
+            self.SHARED_STATE.close()
+        if self.STREAM is not None:
+            self.STREAM.close()
+        if self.METRICS is not None:
+            self.write_metrics()
+        if self.PROFILER is not None:
+            self.stop_profiler()
+            self.echo(f"性能分析已保存至 {self.dump_profile()}")
+        self.echo("保存游戏并退出...")
+        self.OUTPUT.flush()
         sys.exit(0)
 
-    def run(self):
-        """运行游戏"""
+    def mark_ready(self, fast_start: bool):
+        """记录从进程启动到首次出现命令提示符的耗时 (不含剧情等待)"""
+        self.STARTUP_MS = (time.perf_counter() - STARTUP_CLOCK - self.PAUSED_TIME) * 1000
+        self.log_event(f"启动耗时: {self.STARTUP_MS:.1f} ms")
+        if fast_start:
+            color = "32" if self.STARTUP_MS <= STARTUP_TARGET_MS else "33"
+            self.echo(f"\033[{color}m快速启动完成，用时 {self.STARTUP_MS:.1f} ms\033[0m")
+
+    def run(self, fast_start: bool = False):
+        """运行游戏，fast_start 跳过开场剧情直接进入终端"""
+        # 日志等慢速订阅者改为后台批量写入
+        self.BUS.start()
+        
         # 显示初始剧情
-        self.admin_login()
+        if not fast_start:
+            self.admin_login()
         
         # 添加第一个成就
         self.add_achievement("山姆大叔需要你！")
-        self.log_event("系统启动 - 用户登录完成")
+        self.log_event(f"系统启动 - 用户登录完成 (会话种子: {self.SEED}{', 快速启动' if fast_start else ''})")
+        self.start_telemetry()
         
         # 游戏主循环
         while True:
             try:
-                self.update_time()
-                self.update_position()
+                self.tick()
                 self.show_panel()
+                if self.STARTUP_MS is None:
+                    self.mark_ready(fast_start)
                 
-                user_input = input(f"[{self.USER}@curvature-drive]# ").strip()
+                user_input = self.prompt(f"[{self.USER}@curvature-drive]# ").strip()
                 
                 if user_input:
-                    cmd, args, _ = self.parse_command(user_input)
-                    if cmd:
+                    # 管道与宏在校验通过后连续执行，结束后只刷新一次面板
+                    try:
+                        steps = self.parse_pipeline(user_input)
+                    except ValueError as e:
+                        steps = []
+                        self.echo(f"\n❌ {e}\n")
+                    for cmd, args in steps:
                         result = self.process_command(cmd, args)
                         if result:
-                            print(f"\n{result}\n")
+                            self.echo(f"\n{result}\n")
                     
-                    print("按回车继续...")
-                    input()
+                    self.echo("按回车继续...")
+                    self.prompt()
                 
             except KeyboardInterrupt:
-                print("\n\n检测到中断信号，退出游戏...")
+                self.echo("\n\n检测到中断信号，退出游戏...")
                 self.exit_game([])
             except Exception as e:
-                print(f"\n错误: {e}")
-                print("按回车继续...")
-                input()
+                self.echo(f"\n错误: {e}")
+                self.echo("按回车继续...")
+                self.prompt()
 
-if __name__ == "__main__":
+def replay(args):
+    """回放已录制的飞行遥测"""
+    if not 1 <= args.speed <= 10000:
+        print("错误: 回放倍速必须在 1-10000 之间")
+        return
+    try:
+        player = TelemetryReplay(args.file)
+    except (OSError, ValueError) as e:
+        print(f"错误: 无法打开遥测文件 {args.file}: {e}")
+        return
     game = FusionGame()
-    game.run()
\ No newline at end of file
+    try:
+        start = 0
+        if args.seek:
+            try:
+                target = player.start_time + float(args.seek)
+            except ValueError:
+                try:
+                    target = datetime.strptime(args.seek, '%Y-%m-%d %H:%M:%S').timestamp()
+                except ValueError:
+                    print(f"错误: 无法解析起始位置 '{args.seek}'，应为相对秒数或 'YYYY-MM-DD HH:MM:SS'")
+                    return
+            start = player.seek(target)
+        skipped = player.play(game, speed=args.speed, start=start)
+        print(f"回放结束，共 {len(player)} 帧，跳过 {skipped} 帧")
+    except KeyboardInterrupt:
+        print("\n回放已中断")
+    finally:
+        player.close()
+
+
+def monitor(args):
+    """从共享内存读取并显示飞船状态"""
+    reader = SharedStateReader(args.name)
+    try:
+        while True:
+            state = reader.read()
+            ship_state = SHIP_STATES[state["SHIP_STATE"]] if state["SHIP_STATE"] < len(SHIP_STATES) else "未知"
+            position = POSITIONS[state["POSITION"]] if state["POSITION"] < len(POSITIONS) else "未知"
+            print(f"\r[{state['SEQ']}] 速度: {state['SPEED']:.0f} km/h  {state['SPEED_C']:.3f}c  "
+                  f"距离: {state['DISTANCE_KM']:.4e} km  状态: {ship_state}  位置: {position}  "
+                  f"组件: {state['COMPONENTS']:#07x}", end='', flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        reader.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="阿尔库g-05型光速末日飞船")
+    subparsers = parser.add_subparsers(dest="mode")
+    
+    replay_parser = subparsers.add_parser("replay", help="回放飞行遥测录制")
+    replay_parser.add_argument("file", help="遥测文件 (~/.fusion_game/telemetry/*.ftl)")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="回放倍速 1-10000 (默认 1)")
+    replay_parser.add_argument("--seek", help="起始位置: 相对秒数或 'YYYY-MM-DD HH:MM:SS'")
+    
+    monitor_parser = subparsers.add_parser("monitor", help="读取共享内存中的实时飞船状态")
+    monitor_parser.add_argument("--name", default=SHARED_STATE_NAME, help="共享内存名称")
+    monitor_parser.add_argument("--interval", type=float, default=0.5, help="刷新间隔(秒)")
+    
+    parser.add_argument("--export-shm", nargs="?", const=SHARED_STATE_NAME, metavar="NAME",
+                        help="将飞船状态发布到共享内存供外部监控读取")
+    parser.add_argument("--stream", nargs="?", type=int, const=STREAM_PORT, metavar="PORT",
+                        help=f"在本地端口推送飞船状态 (SSE，默认 {STREAM_PORT})")
+    parser.add_argument("--perf", action="store_true", help="启用命令耗时统计，退出时导出 metrics.prom")
+    parser.add_argument("--no-typewriter", action="store_true", help="剧情文字整行显示，不逐字输出")
+    parser.add_argument("--seed", type=int, help="会话随机种子，相同种子与相同命令可完全复现")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="整个会话进行性能分析，退出时写入 ~/.fusion_game/profiles/")
+    parser.add_argument("--fast-start", action="store_true", help="跳过开场剧情，直接进入终端 (适合继续游玩)")
+    
+    args = parser.parse_args(argv)
+    if args.mode == "replay":
+        replay(args)
+    elif args.mode == "monitor":
+        monitor(args)
+    else:
+        game = FusionGame(seed=args.seed, output=TTYSink(typewriter=not args.no_typewriter))
+        if args.export_shm:
+            game.start_state_export(args.export_shm)
+        if args.stream:
+            game.start_state_stream(args.stream)
+        if args.perf:
+            game.enable_metrics()
+        if args.profile:
+            game.start_profiler(args.profile)
+        game.run(fast_start=args.fast_start)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
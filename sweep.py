@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+航程参数扫描
+
+按游戏内的物理模型，对 (功率, 比冲, 曲率光速倍数, 航行时长) 网格批量计算
+航行距离、飞船时间、地球元年与能量消耗，帮助驾驶员规划航程，而不必逐条尝试
+`pfe` / `f` / `ca` / `year`。
+
+    python3 sweep.py --power 10:100:10 --speed-c 0:10:0.5 --duration 3600,86400
+    python3 sweep.py --power 1:100 --impulse 1000:50000:1000 --speed-c 0:20:0.1 --csv trips.csv
+
+范围写作 起点:终点[:步长] (含终点) 或逗号分隔的列表。安装了 numpy 时按数组批量计算，
+否则退回纯 Python 逐点计算；同一规划器内已算过的网格点直接复用。
+"""
+
+import sys
+import csv
+import time
+import argparse
+import itertools
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from main import LY_TO_KM, MAIN_FUSION_MAX_POWER, PFE_IMPULSE_RANGE, PFE_POWER_RANGE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 与 main.py 中 update_position / update_time / detect_year 及各命令的能量记账一致
+LIGHT_SPEED_KM_S = 299792.458
+MAIN_FUSION_KMH_PER_POWER = 10000  # f: 速度 = 功率 * 10000 km/h
+MAIN_FUSION_ENERGY_PER_POWER = 1000000  # f: 能量 = 功率 * 1e6
+WARP_ENERGY = 1e18  # drive
+DILATION_MIN_SPEED_C = 0.1  # 低于此倍数时不计时间膨胀
+BASE_YEAR = 2024
+
+# 功率决定常规推进速度，按 f 的上限检查；超过 pfe 上限的部分 pfe 按其最大功率计能耗
+POWER_RANGE = (1, MAIN_FUSION_MAX_POWER)
+IMPULSE_RANGE = PFE_IMPULSE_RANGE
+PFE_MAX_POWER = PFE_POWER_RANGE[1]
+
+SORT_KEYS = ("distance_ly", "ship_time_s", "earth_year", "energy")
+
+
+class TripResult(NamedTuple):
+    power: int
+    impulse: int
+    speed_c: float
+    duration_s: float
+    distance_ly: float
+    ship_time_s: float
+    earth_year: float
+    energy: float
+
+
+GridPoint = Tuple[int, int, float, float]
+
+
+class TripPlanner:
+    """网格航程计算器，按网格点缓存结果"""
+
+    def __init__(self, use_numpy: bool = True):
+        self.use_numpy = use_numpy and np is not None
+        self.cache: Dict[GridPoint, TripResult] = {}
+
+    def sweep(self, powers: Sequence[int], impulses: Sequence[int],
+              speeds_c: Sequence[float], durations: Sequence[float]) -> List[TripResult]:
+        """计算网格上所有点，按 (功率, 比冲, 光速倍数, 时长) 的字典序返回"""
+        for power in powers:
+            if not POWER_RANGE[0] <= power <= POWER_RANGE[1]:
+                raise ValueError(f"功率必须在 {POWER_RANGE[0]}-{POWER_RANGE[1]} 之间: {power}")
+        for impulse in impulses:
+            if not IMPULSE_RANGE[0] <= impulse <= IMPULSE_RANGE[1]:
+                raise ValueError(f"比冲必须在 {IMPULSE_RANGE[0]}-{IMPULSE_RANGE[1]} 之间: {impulse}")
+        if any(c < 0 for c in speeds_c) or any(d < 0 for d in durations):
+            raise ValueError("光速倍数与航行时长不能为负")
+
+        points = list(itertools.product(powers, impulses, speeds_c, durations))
+        missing = [point for point in dict.fromkeys(points) if point not in self.cache]
+        if missing:
+            compute = self.compute_numpy if self.use_numpy else self.compute_python
+            self.cache.update(zip(missing, compute(missing)))
+        return [self.cache[point] for point in points]
+
+    def evaluate(self, power: int, impulse: int, speed_c: float, duration: float) -> TripResult:
+        return self.sweep([power], [impulse], [speed_c], [duration])[0]
+
+    def compute_python(self, points: List[GridPoint]) -> List[TripResult]:
+        # 距离与时间只取决于 (光速倍数, 时长) 及常规推进下的功率，同一组合只计算一次
+        kinematics = {}
+        results = []
+        for power, impulse, speed_c, duration in points:
+            warp = speed_c > 0
+            key = (speed_c, duration, 0 if warp else power)
+            values = kinematics.get(key)
+            if values is None:
+                values = kinematics[key] = self.kinematics(power, speed_c, duration)
+            energy = (min(power, PFE_MAX_POWER) * impulse // 10 + power * MAIN_FUSION_ENERGY_PER_POWER
+                      + (WARP_ENERGY if warp else 0.0))
+            results.append(TripResult._make((power, impulse, speed_c, duration) + values + (energy,)))
+        return results
+
+    @staticmethod
+    def kinematics(power: int, speed_c: float, duration: float) -> Tuple[float, float, float]:
+        """返回 (距离光年, 飞船时间秒, 地球元年)"""
+        if speed_c > 0:
+            speed_km_s = speed_c * LIGHT_SPEED_KM_S
+        else:
+            speed_km_s = power * MAIN_FUSION_KMH_PER_POWER / 3600
+        distance_ly = speed_km_s * duration / LY_TO_KM
+        ship_time = duration
+        if speed_c > DILATION_MIN_SPEED_C:
+            dilation = 1 / (1 - min(0.999999, speed_c ** 2)) ** 0.5
+            ship_time += distance_ly * 0.1 * dilation
+        return distance_ly, ship_time, BASE_YEAR + distance_ly
+
+    def compute_numpy(self, points: List[GridPoint]) -> List[TripResult]:
+        grid = np.array(points, dtype=np.float64)
+        power, impulse, speed_c, duration = grid.T
+        warp = speed_c > 0
+        speed_km_s = np.where(warp, speed_c * LIGHT_SPEED_KM_S, power * MAIN_FUSION_KMH_PER_POWER / 3600)
+        distance_ly = speed_km_s * duration / LY_TO_KM
+        dilation = 1 / np.sqrt(1 - np.minimum(0.999999, speed_c ** 2))
+        ship_time = duration + np.where(speed_c > DILATION_MIN_SPEED_C, distance_ly * 0.1 * dilation, 0.0)
+        energy = (np.floor_divide(np.minimum(power, PFE_MAX_POWER) * impulse, 10) + power * MAIN_FUSION_ENERGY_PER_POWER
+                  + np.where(warp, WARP_ENERGY, 0.0))
+        columns = (distance_ly.tolist(), ship_time.tolist(), (BASE_YEAR + distance_ly).tolist(), energy.tolist())
+        return [TripResult._make(point + values) for point, values in zip(points, zip(*columns))]
+
+
+def parse_axis(text: str, kind: type) -> List:
+    """解析 '起点:终点[:步长]' (含终点) 或逗号分隔的列表"""
+    if ":" not in text:
+        return [kind(value) for value in text.split(",") if value]
+    parts = [kind(value) for value in text.split(":")]
+    if len(parts) not in (2, 3):
+        raise ValueError(f"范围格式应为 起点:终点[:步长]: {text}")
+    start, stop = parts[0], parts[1]
+    step = parts[2] if len(parts) == 3 else kind(1)
+    if step <= 0:
+        raise ValueError(f"步长必须为正数: {text}")
+    count = int(round((stop - start) / step, 9)) + 1
+    return [kind(round(start + n * step, 9)) for n in range(max(0, count))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="航程参数扫描")
+    parser.add_argument("--power", default="100", help=f"功率 {POWER_RANGE[0]}-{POWER_RANGE[1]} (默认 100)")
+    parser.add_argument("--impulse", default="10000", help=f"比冲 {IMPULSE_RANGE[0]}-{IMPULSE_RANGE[1]} (默认 10000)")
+    parser.add_argument("--speed-c", default="0,1", help="曲率光速倍数，0 为常规推进 (默认 0,1)")
+    parser.add_argument("--duration", default="3600", help="航行时长，秒 (默认 3600)")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="distance_ly", help="排序字段 (默认 distance_ly)")
+    parser.add_argument("--top", type=int, default=20, help="显示前 N 行 (默认 20)")
+    parser.add_argument("--csv", help="全部结果写入 CSV 文件")
+    parser.add_argument("--no-numpy", action="store_true", help="强制使用纯 Python 计算")
+    args = parser.parse_args(argv)
+
+    try:
+        axes = (parse_axis(args.power, int), parse_axis(args.impulse, int),
+                parse_axis(args.speed_c, float), parse_axis(args.duration, float))
+    except ValueError as e:
+        parser.error(str(e))
+
+    planner = TripPlanner(use_numpy=not args.no_numpy)
+    start = time.perf_counter()
+    try:
+        results = planner.sweep(*axes)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    if args.csv:
+        with open(args.csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TripResult._fields)
+            writer.writerows(results)
+
+    engine = "numpy" if planner.use_numpy else "纯 Python"
+    print(f"网格点: {len(results)}  用时: {elapsed:.3f} 秒 ({engine})")
+    print(f"{'功率':>4} {'比冲':>6} {'光速倍数':>8} {'时长(秒)':>10} {'距离(光年)':>14} "
+          f"{'飞船时间(秒)':>14} {'地球元年':>12} {'能量':>10}")
+    for row in sorted(results, key=lambda r: getattr(r, args.sort), reverse=True)[:args.top]:
+        print(f"{row.power:>6} {row.impulse:>8} {row.speed_c:>12g} {row.duration_s:>12g} {row.distance_ly:>18.6e} "
+              f"{row.ship_time_s:>18.6g} {row.earth_year:>16.4f} {row.energy:>12.4e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())